@@ -8,16 +8,16 @@
 
 from __future__ import annotations
 
-from typing import Any, Generator, List
+from typing import List
 
 import asyncio
 import os
 import signal
-import yaml
 
 from commands import (
     animals,
     badapple,
+    desertbus,
     order,
     minecraft,
     prosegen,
@@ -32,16 +32,21 @@ import eorzea.lodestone
 import ffxiv_quotes
 
 from eorzea.storage import SQLite
-from bot import DiscordBot, TwitchBot
-from bot.commands import Command, RateLimitCommand, RandomCommand, RegexCommand
+from bot import DiscordBot, TwitchBot, http
+from bot.commands import Command, RateLimitCommand
+from bot.loader import CommandLoader
 
 
 def main() -> None:
     """Run the bots!"""
     loop = asyncio.get_event_loop()
 
-    commands: List[Command] = custom_commands(loop)
-    commands += list(load_commands_from_yaml())
+    builtin: List[Command] = custom_commands(loop)
+
+    loader = CommandLoader(os.path.join(os.curdir, "commands"), cache="caches")
+    loader.load()
+
+    commands = builtin + loader.commands()
 
     loop.add_signal_handler(signal.SIGINT, loop.stop)
     loop.add_signal_handler(signal.SIGTERM, loop.stop)
@@ -61,6 +66,16 @@ def main() -> None:
     discord = DiscordBot(loop, commands)
     discord_task = loop.create_task(discord.start(token), name="discord")
 
+    poller_task = loop.create_task(desertbus.POLLER.run(), name="desertbus")
+
+    def reload(loaded: List[Command]) -> None:
+        print(f"Reloaded {len(loaded)} commands from YAML")
+
+        irc.set_commands(builtin + loaded)
+        discord.set_commands(builtin + loaded)
+
+    reload_task = loop.create_task(loader.watch(reload), name="reload")
+
     try:
         print("Starting main loop")
         loop.run_forever()
@@ -71,6 +86,13 @@ def main() -> None:
     loop.run_until_complete(discord.close())
     loop.run_until_complete(irc_task)
     loop.run_until_complete(discord_task)
+    poller_task.cancel()
+    reload_task.cancel()
+    irc.cancel_workers()
+    discord.cancel_workers()
+    irc.outbound.cancel()
+    discord.outbound.cancel()
+    loop.run_until_complete(http.CLIENT.close())
     loop.close()
 
 
@@ -78,7 +100,7 @@ def custom_commands(loop: asyncio.AbstractEventLoop) -> List[Command]:
     commands: List[Command] = []
 
     # Final Fantasy XIV.
-    storage = SQLite("list.db")
+    storage = SQLite("list.db", cache=True)
     prose_data = ffxiv_quotes.get_ffxiv_quotes(loop, "ALISAIE", "URIANGER")
 
     commands.extend(
@@ -100,20 +122,22 @@ def custom_commands(loop: asyncio.AbstractEventLoop) -> List[Command]:
             order.TeamOrderBid(),
             order.TeamOrderDonate(),
             order.DesertBusOrder(),
+            desertbus.Subscribe(),
             badapple.BadAppleCommand(),
         ]
     )
 
-    # Animals.
+    # Animals. Each user can have up to a buffer's worth at once, and
+    # then one every 2 seconds, so that the APIs are not spammed.
     commands.extend(
         [
-            RateLimitCommand(animals.Cat(), 2),
-            RateLimitCommand(animals.Dog(), 2),
-            RateLimitCommand(animals.Fox(), 2),
-            RateLimitCommand(animals.Bun(), 2),
-            RateLimitCommand(animals.Bird("bird"), 2),
-            RateLimitCommand(animals.Bird("birb"), 2),
-            RateLimitCommand(animals.Panda(), 2),
+            RateLimitCommand(animals.Cat(), 2, burst=3),
+            RateLimitCommand(animals.Dog(), 2, burst=3),
+            RateLimitCommand(animals.Fox(), 2, burst=3),
+            RateLimitCommand(animals.Bun(), 2, burst=3),
+            RateLimitCommand(animals.Bird("bird"), 2, burst=3),
+            RateLimitCommand(animals.Bird("birb"), 2, burst=3),
+            RateLimitCommand(animals.Panda(), 2, burst=3),
         ]
     )
 
@@ -154,34 +178,5 @@ def custom_commands(loop: asyncio.AbstractEventLoop) -> List[Command]:
     return commands
 
 
-def load_commands_from_yaml() -> Generator[Command, None, None]:
-    cwd = os.curdir
-    command_dir = os.path.join(cwd, "commands")
-
-    for file in os.listdir(command_dir):
-        if not file.endswith(".yaml"):
-            continue
-
-        path = os.path.join(command_dir, file)
-
-        with open(path, "rb") as stream:
-            for block in yaml.load_all(stream, yaml.CSafeLoader):
-                yield from load_command(block)
-
-
-def load_command(data: Any) -> Generator[Command, None, None]:
-    if not isinstance(data, dict):
-        return
-
-    if "commands" in data:
-        yield RandomCommand(
-            data.get("commands", []), data.get("formats", []), data.get("args", {})
-        )
-
-    if "regexp" in data:
-        if isinstance(data["regexp"], str):
-            yield RegexCommand(data["regexp"], data.get("formats", []), data.get("args", {}))
-
-
 if __name__ == "__main__":
     main()
@@ -8,28 +8,133 @@
 
 from __future__ import annotations
 
-from typing import List
+from typing import Dict, Hashable, List, Tuple
 
 import abc
+import asyncio
+import logging
 
-from bot.commands import Command, MessageContext
+from bot.commands import Command, MessageContext, ParsedMessage
+
+
+# A message waiting to be processed, with where to reply to it.
+Queued = Tuple[MessageContext, ParsedMessage]
 
 
 class BaseBot(abc.ABC):
-    """Abstract bot, with command processing."""
+    """Abstract bot, with command processing.
+
+    Messages are queued per channel, and each channel's queue is worked
+    through in order by its own task, so that replies in a channel stay in
+    order while a slow command in one channel does not hold up the rest.
+    The number of commands running at once across all channels is
+    limited."""
+
+    _logger: logging.Logger = logging.getLogger("bot")
+
+    # How many messages may wait in one channel before more are dropped.
+    queue_limit: int = 100
+    # How long a channel's worker waits for a message before it stops.
+    idle_timeout: float = 300
 
     _commands: List[Command]
+    _queues: Dict[Hashable, asyncio.Queue[Queued]]
+    _workers: Dict[Hashable, asyncio.Task[None]]
+    _semaphore: asyncio.Semaphore
+
+    processed: int
+    dropped: int
+    max_depth: int
+
+    def __init__(self: BaseBot, commands: List[Command], concurrency: int = 8):
+        self._commands = list(commands)
+        self._queues = {}
+        self._workers = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
 
-    def __init__(self: BaseBot, commands: List[Command]):
-        self._commands = commands
+        self.processed = 0
+        self.dropped = 0
+        self.max_depth = 0
 
     async def process(self: BaseBot, ctx: MessageContext, message: str) -> None:
+        """Queue an incoming message to be processed
+
+        The message is parsed once here, and shared by every command."""
+
+        channel = ctx.channel_key()
+        queue = self._queues.get(channel)
+
+        if queue is None:
+            queue = self._queues[channel] = asyncio.Queue(self.queue_limit)
+            self._workers[channel] = asyncio.get_running_loop().create_task(
+                self._work(channel, queue)
+            )
+
+        try:
+            queue.put_nowait((ctx, ParsedMessage.parse(message)))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            self._logger.warning("Dropped message in %s, queue is full", ctx.channel())
+            return
+
+        self.max_depth = max(self.max_depth, queue.qsize())
+
+    async def _work(self, channel: Hashable, queue: asyncio.Queue[Queued]) -> None:
+        """Processes the messages for a channel, one at a time."""
+
+        while True:
+            try:
+                ctx, message = await asyncio.wait_for(queue.get(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                # Nothing can be queued between the check and the removal,
+                # as there is no await between them.
+                if queue.empty():
+                    del self._queues[channel]
+                    del self._workers[channel]
+                    return
+
+                continue
+
+            async with self._semaphore:
+                try:
+                    await self.run_commands(ctx, message)
+                except Exception:  # pylint: disable=broad-except
+                    self._logger.exception(
+                        "Error processing %r in %s", message.text, ctx.channel()
+                    )
+
+            self.processed += 1
+
+    async def run_commands(
+        self: BaseBot, ctx: MessageContext, message: ParsedMessage
+    ) -> None:
         """Process an incoming message"""
 
-        for command in self._commands:
+        # The commands may be replaced while this message is being processed,
+        # in which case it finishes with the commands it started with.
+        commands = self._commands
+
+        for command in commands:
             if command.matches(message):
                 if await command.process(ctx, message):
                     return
 
+    def set_commands(self, commands: List[Command]) -> None:
+        """Replaces the commands, such as when they are reloaded.
+
+        Messages already being processed keep the old commands, and any
+        that are still queued get the new ones."""
+        self._commands = list(commands)
+
+    def queue_depths(self) -> Dict[Hashable, int]:
+        """Gets the number of messages waiting in each channel."""
+        return {channel: queue.qsize() for channel, queue in self._queues.items()}
+
+    def cancel_workers(self) -> None:
+        """Stops processing queued messages, such as when shutting down."""
+
+        for worker in self._workers.values():
+            worker.cancel()
+
     def __str__(self) -> str:
         return str(self)
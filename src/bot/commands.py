@@ -8,12 +8,42 @@
 
 from __future__ import annotations
 
-import random
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
 
 import abc
+import dataclasses
 import re
-import time
+
+from bot.ratelimit import TokenBuckets
+from bot.templates import WeightedTemplates
+
+
+@dataclasses.dataclass(frozen=True)
+class ParsedMessage:
+    """A message, split up once so that every command can share the work.
+
+    The trigger is the first word in lower case (such as "!cat"), and the
+    args are the rest of the words as they were written."""
+
+    text: str
+    lower: str
+    trigger: str
+    args: Tuple[str, ...]
+    lines: Tuple[str, ...]
+
+    @classmethod
+    def parse(cls, text: str) -> ParsedMessage:
+        """Parses the text of a message"""
+
+        words = text.split()
+
+        return cls(
+            text,
+            text.lower(),
+            words[0].lower() if words else "",
+            tuple(words[1:]),
+            tuple(text.split("\n")),
+        )
 
 
 class MessageContext(abc.ABC):
@@ -35,40 +65,51 @@ class MessageContext(abc.ABC):
     def sender(self) -> str:
         """Gets the username of the user who sent the message"""
 
+    @abc.abstractmethod
+    def is_moderator(self) -> bool:
+        """Whether the user who sent the message moderates the channel"""
+
     @abc.abstractmethod
     def channel(self) -> str:
         """Gets the channel where the message was sent"""
 
+    @abc.abstractmethod
+    def channel_id(self) -> Hashable:
+        """Gets an identifier for the channel that is unique on the platform,
+        unlike the name (which is shared by every Discord DM, for example)"""
+
+    def channel_key(self) -> Tuple[str, Hashable]:
+        """Gets an identifier for the channel that is unique across platforms"""
+        return type(self).__name__, self.channel_id()
+
 
 class Command(abc.ABC):
     """Abstract command for the bot to process."""
 
     @abc.abstractmethod
-    def matches(self, message: str) -> bool:
+    def matches(self, message: ParsedMessage) -> bool:
         """Check if this command is matched"""
 
     @abc.abstractmethod
-    async def process(self, context: MessageContext, message: str) -> bool:
+    async def process(self, context: MessageContext, message: ParsedMessage) -> bool:
         """Handle the command in the message"""
 
 
-class SimpleCommand(Command, abc.ABC):
-    """A command with no arguments which returns a string."""
+class AsyncSimpleCommand(Command, abc.ABC):
+    """A command with no arguments which awaits a string, such as from an API."""
 
     _command: str
 
     def __init__(self, command: str):
         self._command = "!" + command.strip().lower()
 
-    def matches(self, message: str) -> bool:
+    def matches(self, message: ParsedMessage) -> bool:
         """Check if this command is matched"""
-        return message.lower() == self._command or message.lower().startswith(
-            self._command + " "
-        )
+        return message.trigger == self._command
 
-    async def process(self, context: MessageContext, message: str) -> bool:
+    async def process(self, context: MessageContext, message: ParsedMessage) -> bool:
         """Handle the command in the message"""
-        reply = self.message()
+        reply = await self.reply()
 
         if reply is None:
             return False
@@ -77,35 +118,47 @@ class SimpleCommand(Command, abc.ABC):
 
         return True
 
+    @abc.abstractmethod
+    async def reply(self) -> Optional[str]:
+        pass
+
+
+class SimpleCommand(AsyncSimpleCommand, abc.ABC):
+    """A command with no arguments which returns a string."""
+
+    async def reply(self) -> Optional[str]:
+        return self.message()
+
     @abc.abstractmethod
     def message(self) -> Optional[str]:
         pass
 
 
 class RandomCommand(Command):
-    _triggers: List[str]
-    _replies: List[str]
-    _params: Dict[str, List[str]]
+    _triggers: Set[str]
+    _replies: WeightedTemplates
+    _params: Dict[str, WeightedTemplates]
 
-    def __init__(
-        self, triggers: List[str], replies: List[str], args: Dict[str, List[str]]
-    ) -> None:
-        self._triggers = ["!" + trigger.strip("!") for trigger in triggers]
-        self._replies = [str(x) for x in replies]
-        self._params = {k: [str(x) for x in v] for k, v in args.items()}
+    def __init__(self, triggers: List[str], replies: Any, args: Dict[str, Any]) -> None:
+        """Sets up the command.
 
-    def matches(self, message: str) -> bool:
-        return any(message.startswith(x + " ") or message == x for x in self._triggers)
+        Replies, and the values for each argument, are anything that
+        `WeightedTemplates.from_yaml` accepts."""
+        self._triggers = {"!" + trigger.strip("!").lower() for trigger in triggers}
+        self._replies = WeightedTemplates.from_yaml(replies)
+        self._params = {k: WeightedTemplates.from_yaml(v) for k, v in args.items()}
 
-    async def process(self, context: MessageContext, message: str) -> bool:
-        reply_format = random.choice(self._replies)
+    def matches(self, message: ParsedMessage) -> bool:
+        return message.trigger in self._triggers
 
-        if not reply_format:
+    async def process(self, context: MessageContext, message: ParsedMessage) -> bool:
+        if not self._replies:
             return False
 
-        args = {k: random.choice(self._params[k]) for k in self._params}
+        reply = self._replies.format_with(self._params)
 
-        reply = reply_format.format(**args)
+        if not reply:
+            return False
 
         await context.reply_all(reply)
         return True
@@ -116,40 +169,63 @@ class RegexCommand(RandomCommand, abc.ABC):
 
     _regexp: re.Pattern  # type: ignore
 
-    def __init__(self, pattern: str, replies: List[str], args: Dict[str, List[str]]) -> None:
+    def __init__(self, pattern: str, replies: Any, args: Dict[str, Any]) -> None:
         super().__init__([], replies, args)
         self._regexp = re.compile(pattern, re.IGNORECASE)
 
-    def matches(self, message: str) -> bool:
+    def matches(self, message: ParsedMessage) -> bool:
         """Check if this command is matched"""
 
-        return self._regexp.search(message) is not None
+        return self._regexp.search(message.text) is not None
 
 
 class RateLimitCommand(Command):
-    """Command decorator that rate limits a command"""
+    """Command decorator that rate limits a command.
+
+    Each user in each channel gets `burst` uses of the command, which come
+    back at one per `interval` seconds. With `per_user` off, everyone in a
+    channel shares the limit instead."""
 
-    _last: float = 0
-    _interval: float
     _command: Command
+    _buckets: TokenBuckets
+    _per_user: bool
 
-    def __init__(self, command: Command, interval: float):
+    def __init__(
+        self, command: Command, interval: float, burst: int = 1, per_user: bool = True
+    ):
         self._command = command
-        self._interval = interval
+        self._buckets = TokenBuckets(interval, burst)
+        self._per_user = per_user
 
-    def matches(self, message: str) -> bool:
+    @classmethod
+    def from_yaml(cls, command: Command, data: Any) -> RateLimitCommand:
+        """Rate limits a command with the limit from a parsed YAML value.
+
+        This is either the interval in seconds, or a mapping with an
+        `interval` and optional `burst` and `per_user` keys."""
+
+        if isinstance(data, dict):
+            return cls(
+                command,
+                float(data["interval"]),
+                int(data.get("burst", 1)),
+                bool(data.get("per_user", True)),
+            )
+
+        return cls(command, float(data))
+
+    def matches(self, message: ParsedMessage) -> bool:
         """Check if this command is matched"""
         return self._command.matches(message)
 
-    async def process(self, context: MessageContext, message: str) -> bool:
+    async def process(self, context: MessageContext, message: ParsedMessage) -> bool:
         """Handle the command in the message"""
-        now = time.time()
+        # Channels of the same name in different places are different.
+        key = (context.channel_key(), context.sender() if self._per_user else None)
 
-        if now - self._last < self._interval:
+        if not self._buckets.acquire(key):
             return False
 
-        self._last = now
-
         return await self._command.process(context, message)
 
 
@@ -165,25 +241,16 @@ class ParamCommand(Command):
         self._min_args = min_args
         self._max_args = max_args
 
-        if self._min_args > 0:
-            self._command += " "
-
-    def matches(self, message: str) -> bool:
+    def matches(self, message: ParsedMessage) -> bool:
         """Check if this command is matched"""
-        if message.lower() != self._command and not message.startswith(self._command):
+        if message.trigger != self._command:
             return False
 
-        args = message.strip().split()
-
-        count = len(args) - 1  # The command name does not count as an arg.
+        return self._min_args <= len(message.args) <= self._max_args
 
-        return self._min_args <= count <= self._max_args
-
-    async def process(self, context: MessageContext, message: str) -> bool:
+    async def process(self, context: MessageContext, message: ParsedMessage) -> bool:
         """Handle the command in the message"""
-        args = message.strip().split()
-
-        return await self.process_args(context, *args[1:])
+        return await self.process_args(context, *message.args)
 
     @abc.abstractmethod
     async def process_args(self, context: MessageContext, *args: str) -> bool:
@@ -28,6 +28,7 @@ from discord import (
 
 from bot.basebot import BaseBot
 from bot.commands import Command, MessageContext
+from bot.outbound import OutboundQueue
 
 import bot.role_manager
 import bot.voice_activity
@@ -36,12 +37,17 @@ import bot.voice_activity
 class DiscordBot(Client, BaseBot):
     """The Discord bot"""
 
+    outbound: OutboundQueue
+
     def __init__(self: DiscordBot, loop: asyncio.AbstractEventLoop, commands: List[Command]):
         intents = Intents.all()
 
         BaseBot.__init__(self, commands)
         Client.__init__(self, intents=intents, loop=loop)
 
+        # Discord allows about 5 messages per 5 seconds in each channel (1 + 5 / 1.25).
+        self.outbound = OutboundQueue(interval=1.25, burst=1, max_length=2000)
+
     async def on_ready(self: DiscordBot) -> None:
         """When the bot connects."""
         print(f"{self.user} has connected to Discord!")
@@ -53,7 +59,7 @@ class DiscordBot(Client, BaseBot):
             return
 
         await bot.voice_activity.voice_activity_message(message)
-        await self.process(DiscordMessageContext(message), message.content)
+        await self.process(DiscordMessageContext(message, self.outbound), message.content)
 
     async def on_raw_reaction_add(self, reaction: RawReactionActionEvent) -> None:
         """Handle random reactions"""
@@ -122,17 +128,37 @@ class DiscordMessageContext(MessageContext):
     """Discord message context."""
 
     _message: Message
+    _outbound: OutboundQueue
 
-    def __init__(self, message: Message):
+    def __init__(self, message: Message, outbound: OutboundQueue):
         self._message = message
+        self._outbound = outbound
 
     async def reply_direct(self, message: str) -> None:
         """Reply directly to the user who sent this message."""
         await self._message.author.send(message)
 
-    async def reply_all(self, message: Union[str, Embed]) -> Message:
-        """Reply to the channel this message was received in"""
+    async def reply_all(self, message: Union[str, Embed]) -> None:
+        """Reply to the channel this message was received in
+
+        The reply is queued without waiting for it to be sent, so that it
+        can be joined with other replies to the channel."""
+
+        self._outbound.post(self._message.channel.id, self._send, message)
+
+    async def reply_message(self, message: Union[str, Embed]) -> Message:
+        """Reply to the channel this message was received in, and wait for
+        the sent message, such as when it will be edited.
+
+        The reply is never joined with other replies."""
 
+        sent: Message = await self._outbound.send(
+            self._message.channel.id, self._send, message, coalesce=False
+        )
+
+        return sent
+
+    async def _send(self, message: Union[str, Embed]) -> Message:
         if isinstance(message, Embed):
             return await self._message.channel.send(embed=message)
 
@@ -145,8 +171,19 @@ class DiscordMessageContext(MessageContext):
     def sender(self) -> str:
         return str(self._message.author.name) + "#" + str(self._message.author.discriminator)
 
+    def is_moderator(self) -> bool:
+        # There is no one else to moderate a DM.
+        if isinstance(self._message.channel, DMChannel):
+            return True
+
+        permissions = self._message.channel.permissions_for(self._message.author)  # type: ignore
+        return bool(permissions.manage_messages)
+
     def channel(self) -> str:
         if isinstance(self._message.channel, DMChannel):
             return "[DMs]"
 
         return str(self._message.channel.name)  # type: ignore
+
+    def channel_id(self) -> int:
+        return int(self._message.channel.id)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2021 Benedict Harcourt <ben.harcourt@harcourtprogramming.co.uk>
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""Shared HTTP client for commands that call external APIs"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+import asyncio
+import time
+
+import aiohttp
+
+
+# Responses that are worth retrying, as the server may succeed next time.
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+
+class HttpClient:
+    """A pooled HTTP client, shared by every command that calls an API.
+
+    All requests go through one `aiohttp.ClientSession`, so connections
+    (and their TLS handshakes) are reused between commands. The number of
+    connections to any one host is limited, and every request has a
+    timeout, so a slow API can only delay the commands that use it."""
+
+    limit: int
+    limit_per_host: int
+    timeout: aiohttp.ClientTimeout
+    retries: int
+    backoff: float
+
+    _session: Optional[aiohttp.ClientSession]
+
+    def __init__(
+        self,
+        limit: int = 32,
+        limit_per_host: int = 4,
+        timeout: float = 10,
+        retries: int = 2,
+        backoff: float = 0.5,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=timeout / 2)
+        self.retries = retries
+        self.backoff = backoff
+
+        self._session = None
+
+    def session(self) -> aiohttp.ClientSession:
+        """Gets the shared session, creating it on first use.
+
+        The session is created lazily as it must be created inside the
+        running event loop."""
+
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit, limit_per_host=self.limit_per_host, ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+        return self._session
+
+    async def get_json(self, url: str, params: Optional[Dict[str, str]] = None) -> Any:
+        """Fetches and decodes a JSON document.
+
+        Connection errors, timeouts, and server errors are retried with
+        exponential back off; the last error is raised if all attempts fail."""
+
+        attempt = 0
+
+        while True:
+            try:
+                async with self.session().get(url, params=params) as response:
+                    if response.status not in RETRY_STATUSES or attempt >= self.retries:
+                        response.raise_for_status()
+                        return await response.json(content_type=None)
+            except aiohttp.ClientResponseError:
+                # Raised for statuses that are not worth retrying.
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt >= self.retries:
+                    raise
+
+            await asyncio.sleep(self.backoff * 2**attempt)
+            attempt += 1
+
+    async def close(self) -> None:
+        """Closes the shared session, and all of its connections."""
+
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class CachedJson:
+    """A JSON document that is fetched at most once every `ttl` seconds.
+
+    Concurrent callers share a single in-flight request. Once the cached
+    copy is older than `ttl`, it is still returned for up to `stale` more
+    seconds while a refresh happens in the background; after that, callers
+    wait for the refresh."""
+
+    url: str
+    ttl: float
+    stale: float
+    client: HttpClient
+
+    _value: Any
+    _fetched: Optional[float]
+    _pending: Optional[asyncio.Task[Any]]
+
+    def __init__(
+        self,
+        url: str,
+        ttl: float,
+        stale: float = 0,
+        client: Optional[HttpClient] = None,
+    ):
+        self.url = url
+        self.ttl = ttl
+        self.stale = stale
+        self.client = client or CLIENT
+
+        self._value = None
+        self._fetched = None
+        self._pending = None
+
+    async def get(self) -> Any:
+        """Gets the document, from the cache if it is fresh enough."""
+
+        if self._fetched is not None:
+            age = time.monotonic() - self._fetched
+
+            if age < self.ttl:
+                return self._value
+
+            if age < self.ttl + self.stale:
+                self.refresh()
+                return self._value
+
+        # Shielded so that a cancelled caller does not cancel the request
+        # that other callers are waiting on.
+        return await asyncio.shield(self.refresh())
+
+    def refresh(self) -> asyncio.Task[Any]:
+        """Starts fetching the document, unless a fetch is already in flight."""
+
+        if self._pending is None:
+            self._pending = asyncio.get_running_loop().create_task(self._fetch())
+            self._pending.add_done_callback(self._done)
+
+        return self._pending
+
+    async def _fetch(self) -> Any:
+        value = await self.client.get_json(self.url)
+
+        self._value = value
+        self._fetched = time.monotonic()
+
+        return value
+
+    def _done(self, task: asyncio.Task[Any]) -> None:
+        self._pending = None
+
+        # Also marks the error as retrieved for background refreshes,
+        # which have no caller to raise it to.
+        if not task.cancelled() and task.exception():
+            print(f"Unable to fetch {self.url}:", task.exception())
+
+
+CLIENT = HttpClient()
+
+
+async def get_json(url: str, params: Optional[Dict[str, str]] = None) -> Any:
+    """Fetches and decodes a JSON document with the shared client."""
+    return await CLIENT.get_json(url, params)
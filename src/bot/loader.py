@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2021 Benedict Harcourt <ben.harcourt@harcourtprogramming.co.uk>
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""Loading (and reloading) commands defined in YAML files"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Generator, List, Optional, Tuple
+
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import re
+
+import yaml
+
+from bot.commands import Command, RandomCommand, RateLimitCommand, RegexCommand
+from bot.templates import WeightedTemplates
+
+
+# Bump this when the validation changes, so older caches are ignored.
+CACHE_VERSION = 2
+
+
+class CommandLoader:
+    """Loads the commands from each YAML file in a directory.
+
+    Files are checked for changes by their modification time and size, and
+    only the files that have changed are parsed again. The commands from
+    unchanged files are kept as they are, along with their rate limits.
+
+    With a `cache` directory, the parsed definitions are also kept there
+    as JSON, which is much quicker to load than YAML at start up."""
+
+    directory: str
+    cache: Optional[str]
+
+    # The modification time and size of each file, and its commands.
+    _files: Dict[str, Tuple[Tuple[int, int], List[Command]]]
+
+    def __init__(self, directory: str, cache: Optional[str] = None):
+        self.directory = directory
+        self.cache = cache
+        self._files = {}
+
+    def commands(self) -> List[Command]:
+        """Gets the commands from all the loaded files"""
+        return [command for path in sorted(self._files) for command in self._files[path][1]]
+
+    def load(self) -> bool:
+        """Loads any files that have been added or changed since the last
+        load, and forgets any that have been removed.
+
+        Returns whether anything changed. A file that fails to parse keeps
+        the commands it had before."""
+
+        changed = False
+        paths = set()
+
+        for file in os.listdir(self.directory):
+            if not file.endswith(".yaml"):
+                continue
+
+            path = os.path.join(self.directory, file)
+            stat = os.stat(path)
+            version = (stat.st_mtime_ns, stat.st_size)
+
+            paths.add(path)
+
+            if path in self._files and self._files[path][0] == version:
+                continue
+
+            try:
+                commands = list(load_commands_from_file(path, self.cache))
+            except Exception as error:  # pylint: disable=broad-except
+                print(f"Unable to load commands from {path}:", error)
+                commands = self._files[path][1] if path in self._files else []
+
+            self._files[path] = (version, commands)
+            changed = True
+
+        for path in set(self._files) - paths:
+            del self._files[path]
+            changed = True
+
+        return changed
+
+    async def watch(
+        self, reload: Callable[[List[Command]], None], interval: float = 5
+    ) -> None:
+        """Checks for changed files every `interval` seconds, until
+        cancelled, and calls `reload` with the new commands when any have
+        changed."""
+
+        while True:
+            await asyncio.sleep(interval)
+
+            try:
+                changed = self.load()
+            except OSError as error:
+                print(f"Unable to check {self.directory} for commands:", error)
+                continue
+
+            if changed:
+                reload(self.commands())
+
+
+def load_commands_from_file(
+    path: str, cache: Optional[str] = None
+) -> Generator[Command, None, None]:
+    """Loads the commands from each block of a YAML file"""
+
+    for block in load_blocks(path, cache):
+        yield from load_command(block)
+
+
+def load_blocks(path: str, cache: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Reads the validated command definitions from a YAML file.
+
+    With a `cache` directory, the definitions are read from a JSON copy
+    keyed by the hash of the file, and the YAML is only parsed (and the
+    copy written) when there is no copy for the current contents."""
+
+    with open(path, "rb") as stream:
+        content = stream.read()
+
+    if cache is None:
+        return parse_blocks(content)
+
+    name = os.path.basename(path)
+    digest = hashlib.sha256(content).hexdigest()
+    cache_path = os.path.join(cache, f"{name}-{CACHE_VERSION}-{digest}.json")
+
+    try:
+        with open(cache_path, "r", encoding="utf-8") as cached_file:
+            blocks: List[Dict[str, Any]] = json.load(cached_file)
+            return blocks
+    except (OSError, ValueError):
+        pass
+
+    blocks = parse_blocks(content)
+
+    try:
+        save_blocks(cache_path, blocks)
+    except (OSError, TypeError, ValueError) as error:
+        print(f"Unable to cache commands from {path}:", error)
+
+    # Copies for the previous contents of the file are no longer needed.
+    for old_path in glob.glob(os.path.join(cache, glob.escape(name) + "-*.json")):
+        if old_path != cache_path:
+            os.remove(old_path)
+
+    return blocks
+
+
+def parse_blocks(content: bytes) -> List[Dict[str, Any]]:
+    """Parses and validates each block of YAML that defines commands.
+
+    Invalid regexes and templates raise here, so that a bad definition
+    is never cached."""
+
+    blocks: List[Dict[str, Any]] = []
+
+    for block in yaml.load_all(content, yaml.CSafeLoader):
+        if not isinstance(block, dict):
+            continue
+
+        if isinstance(block.get("regexp"), str):
+            re.compile(block["regexp"], re.IGNORECASE)
+
+        args = {
+            name: WeightedTemplates.from_yaml(values)
+            for name, values in block.get("args", {}).items()
+        }
+
+        WeightedTemplates.from_yaml(block.get("formats", [])).validate(args)
+
+        blocks.append(block)
+
+    return blocks
+
+
+def save_blocks(path: str, blocks: List[Dict[str, Any]]) -> None:
+    """Writes the definitions to a cache file.
+
+    The file is written in full before it is moved into place, so a
+    partial file is never read back."""
+
+    os.makedirs(os.path.dirname(path) or os.curdir, exist_ok=True)
+
+    temp_path = path + ".tmp"
+
+    with open(temp_path, "w", encoding="utf-8") as cached_file:
+        json.dump(blocks, cached_file)
+
+    os.replace(temp_path, path)
+
+
+def load_command(data: Any) -> Generator[Command, None, None]:
+    """Creates the commands defined by a block of YAML"""
+
+    if not isinstance(data, dict):
+        return
+
+    commands: List[Command] = []
+
+    if "commands" in data:
+        commands.append(
+            RandomCommand(
+                data.get("commands", []), data.get("formats", []), data.get("args", {})
+            )
+        )
+
+    if "regexp" in data:
+        if isinstance(data["regexp"], str):
+            commands.append(
+                RegexCommand(data["regexp"], data.get("formats", []), data.get("args", {}))
+            )
+
+    for command in commands:
+        if "rate_limit" in data:
+            yield RateLimitCommand.from_yaml(command, data["rate_limit"])
+        else:
+            yield command
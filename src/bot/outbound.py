@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2021 Benedict Harcourt <ben.harcourt@harcourtprogramming.co.uk>
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""Rate limited sending of replies"""
+
+from __future__ import annotations
+
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Counter,
+    Deque,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+)
+
+import asyncio
+import collections
+
+from bot.ratelimit import TokenBuckets
+
+
+# Sends a message (usually a string) to a channel, returning what the
+# platform returns for the sent message.
+Send = Callable[[Any], Awaitable[Any]]
+
+# A queued message: what to send, whether it may be joined with the
+# messages around it, how to send it, and the future awaiting the result
+# (if anything is waiting for it).
+Outgoing = Tuple[Any, bool, Send, Optional["asyncio.Future[Any]"]]
+
+
+class OutboundQueue:
+    """Queues replies per channel, and sends them within a rate limit.
+
+    Each channel gets a token bucket and a worker that sends its queue in
+    order. When messages back up, consecutive strings are joined into one
+    message, up to the platform's length limit; anything else, such as an
+    embed, is always sent on its own.
+
+    A token bucket sends at most `burst + window / interval` messages in
+    any window of time. With `per_channel` off, every channel shares one
+    bucket, for platforms whose limit is per account."""
+
+    max_length: int
+    separator: str
+    per_channel: bool
+
+    # How many messages were sent, and how many replies were joined into them.
+    stats: Counter[str]
+
+    _buckets: TokenBuckets
+    _queues: Dict[Hashable, Deque[Outgoing]]
+    _workers: Dict[Hashable, asyncio.Task[None]]
+
+    def __init__(
+        self,
+        interval: float,
+        burst: int = 1,
+        max_length: int = 2000,
+        separator: str = "\n",
+        per_channel: bool = True,
+    ):
+        self.max_length = max_length
+        self.separator = separator
+        self.per_channel = per_channel
+
+        self.stats = collections.Counter()
+
+        self._buckets = TokenBuckets(interval, burst)
+        self._queues = {}
+        self._workers = {}
+
+    async def send(
+        self, channel: Hashable, send: Send, message: Any, coalesce: bool = True
+    ) -> Any:
+        """Queues a message for a channel, and waits for it to be sent.
+
+        Returns the result of sending the message, which is shared by every
+        message that was joined with it."""
+
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+
+        self._queue(channel, (message, coalesce and isinstance(message, str), send, future))
+
+        return await future
+
+    def post(
+        self, channel: Hashable, send: Send, message: Any, coalesce: bool = True
+    ) -> None:
+        """Queues a message for a channel, without waiting for it to be sent.
+
+        As nothing is waiting for the result, errors are printed instead."""
+
+        self._queue(channel, (message, coalesce and isinstance(message, str), send, None))
+
+    def _queue(self, channel: Hashable, outgoing: Outgoing) -> None:
+        queue = self._queues.setdefault(channel, collections.deque())
+
+        queue.append(outgoing)
+
+        if channel not in self._workers:
+            self._workers[channel] = asyncio.get_running_loop().create_task(
+                self._work(channel, queue)
+            )
+
+    async def _work(self, channel: Hashable, queue: Deque[Outgoing]) -> None:
+        bucket = channel if self.per_channel else None
+
+        while queue:
+            # Another channel's worker may take a shared token first.
+            while not self._buckets.acquire(bucket):
+                await asyncio.sleep(self._buckets.wait_time(bucket))
+
+            message, send, futures = self._take(queue)
+
+            try:
+                result = await send(message)
+            except Exception as error:  # pylint: disable=broad-except
+                if not futures:
+                    print(f"Unable to send to {channel}:", error)
+
+                for future in futures:
+                    _resolve(future, error=error)
+            else:
+                for future in futures:
+                    _resolve(future, result)
+
+            self.stats["sent"] += 1
+
+        # There is no await between the queue being empty and the worker
+        # being removed, so nothing new can be missed.
+        del self._queues[channel]
+        del self._workers[channel]
+
+    def _take(self, queue: Deque[Outgoing]) -> Tuple[Any, Send, List[asyncio.Future[Any]]]:
+        """Takes the next message, joined with any that can follow it."""
+
+        message, coalesce, send, future = queue.popleft()
+        futures = [future] if future else []
+
+        if not coalesce:
+            return message, send, futures
+
+        parts = [message]
+        length = len(message)
+
+        while queue and queue[0][1]:
+            length += len(self.separator) + len(queue[0][0])
+
+            if length > self.max_length:
+                break
+
+            parts.append(queue[0][0])
+            future = queue.popleft()[3]
+
+            if future:
+                futures.append(future)
+
+        self.stats["coalesced"] += len(parts) - 1
+
+        return self.separator.join(parts), send, futures
+
+    def backlog(self) -> Dict[Hashable, int]:
+        """Gets the number of messages waiting to be sent to each channel."""
+        return {channel: len(queue) for channel, queue in self._queues.items()}
+
+    def cancel(self) -> None:
+        """Stops sending queued messages, such as when shutting down."""
+
+        for worker in self._workers.values():
+            worker.cancel()
+
+
+def _resolve(
+    future: asyncio.Future[Any], result: Any = None, error: Optional[Exception] = None
+) -> None:
+    # The waiting reply may have been cancelled.
+    if future.done():
+        return
+
+    if error:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2021 Benedict Harcourt <ben.harcourt@harcourtprogramming.co.uk>
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""Token bucket rate limiting"""
+
+from __future__ import annotations
+
+from typing import Hashable, Optional, Tuple
+
+import collections
+import time
+
+
+class TokenBuckets:
+    """A set of token buckets, one per key, that refill continuously.
+
+    Each bucket holds up to `burst` tokens, and gains one every `interval`
+    seconds; an action is allowed if it can take a token. A bucket that
+    has been idle long enough to be full is the same as having no bucket,
+    so it is dropped. Buckets are kept in the order they were last used,
+    which makes finding the idle ones cheap."""
+
+    interval: float
+    burst: int
+    max_keys: int
+
+    # The tokens in each bucket, as of when it was last used.
+    _buckets: collections.OrderedDict[Hashable, Tuple[float, float]]
+
+    def __init__(self, interval: float, burst: int = 1, max_keys: int = 10000):
+        if interval <= 0 or burst < 1:
+            raise Exception("Rate limits need a positive interval and a burst of at least 1")
+
+        self.interval = interval
+        self.burst = burst
+        self.max_keys = max_keys
+
+        self._buckets = collections.OrderedDict()
+
+    def acquire(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """Takes a token from the bucket for a key, if there is one."""
+
+        now = time.monotonic() if now is None else now
+
+        self._expire(now)
+
+        tokens, updated = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) / self.interval)
+
+        allowed = tokens >= 1
+
+        self._buckets[key] = (tokens - 1 if allowed else tokens, now)
+
+        return allowed
+
+    def wait_time(self, key: Hashable, now: Optional[float] = None) -> float:
+        """Gets how long until the bucket for a key will have a token."""
+
+        now = time.monotonic() if now is None else now
+
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) / self.interval)
+
+        return max(0.0, (1 - tokens) * self.interval)
+
+    def _expire(self, now: float) -> None:
+        # An empty bucket is full again after this long.
+        idle = self.burst * self.interval
+
+        while self._buckets:
+            key, (_, updated) = next(iter(self._buckets.items()))
+
+            if now - updated < idle and len(self._buckets) < self.max_keys:
+                break
+
+            del self._buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
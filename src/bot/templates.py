@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2021 Benedict Harcourt <ben.harcourt@harcourtprogramming.co.uk>
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""Weighted random tables of `str.format` templates"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Tuple
+
+import random
+import re
+import string
+
+
+# The part of a format field name that names the argument, e.g. "a" in "a.b[0]".
+_FIELD_ROOT = re.compile(r"[.\[]")
+
+
+class WeightedTemplates:
+    """A weighted random table of `str.format` templates.
+
+    Templates are given explicit weights, rather than being repeated in a
+    list, and are sampled in constant time using Vose's alias method. The
+    fields each template uses are found once, up front, so that callers can
+    generate only the arguments the chosen template needs."""
+
+    templates: List[str]
+    fields: List[FrozenSet[str]]
+
+    _probability: List[float]
+    _alias: List[int]
+
+    def __init__(self, templates: Iterable[Tuple[str, float]]):
+        weights: Dict[str, float] = {}
+
+        # Repeated templates are combined in to a single entry.
+        for template, weight in templates:
+            if weight <= 0:
+                raise Exception(f"Template weights must be positive, got {weight}")
+
+            weights[template] = weights.get(template, 0) + weight
+
+        self.templates = list(weights)
+        self.fields = [template_fields(template) for template in self.templates]
+        self._probability, self._alias = alias_table(list(weights.values()))
+
+    @classmethod
+    def from_yaml(cls, data: Any) -> WeightedTemplates:
+        """Creates a table from a parsed YAML value.
+
+        This can be a list, where each entry is either a template with a
+        weight of one or a mapping with `format` and optional `weight` keys,
+        or a mapping of templates to their weights."""
+
+        if isinstance(data, Mapping):
+            return cls((str(template), float(weight)) for template, weight in data.items())
+
+        entries: List[Tuple[str, float]] = []
+
+        for entry in data or []:
+            if isinstance(entry, Mapping):
+                entries.append((str(entry["format"]), float(entry.get("weight", 1))))
+            else:
+                entries.append((str(entry), 1))
+
+        return cls(entries)
+
+    def index(self) -> int:
+        """Chooses the index of a random template, according to the weights."""
+
+        column = random.randrange(len(self.templates))
+
+        if random.random() < self._probability[column]:
+            return column
+
+        return self._alias[column]
+
+    def choose(self) -> str:
+        """Chooses a random template, according to the weights."""
+        return self.templates[self.index()]
+
+    def format(self, **kwargs: Any) -> str:
+        """Chooses a random template, and formats it with the given arguments."""
+        return self.templates[self.index()].format(**kwargs)
+
+    def format_with(self, args: Mapping[str, WeightedTemplates]) -> str:
+        """Chooses a random template, and formats it with a random choice from
+        each of the argument tables the template uses."""
+
+        index = self.index()
+        values = {name: args[name].choose() for name in self.fields[index] if name in args}
+
+        return self.templates[index].format(**values)
+
+    def validate(self, args: Mapping[str, WeightedTemplates]) -> None:
+        """Checks that every template can be formatted by `format_with`.
+
+        Each template is formatted once with the first value of each argument
+        table, which fails for broken braces, positional fields, and fields
+        that are not one of the arguments."""
+
+        values = {name: table.templates[0] if table else "" for name, table in args.items()}
+
+        for template in self.templates:
+            try:
+                template.format(**values)
+            except (ValueError, KeyError, IndexError, AttributeError) as error:
+                raise Exception(f"Invalid template {template!r}: {error!r}") from error
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+
+def template_fields(template: str) -> FrozenSet[str]:
+    """Gets the names of the arguments that a format template uses.
+
+    Strings that are not valid templates (such as argument values with a
+    stray brace) have no fields; formatting them will still fail."""
+
+    try:
+        parsed = list(string.Formatter().parse(template))
+    except ValueError:
+        return frozenset()
+
+    return frozenset(_FIELD_ROOT.split(field, 1)[0] for _, field, _, _ in parsed if field)
+
+
+def alias_table(weights: List[float]) -> Tuple[List[float], List[int]]:
+    """Builds the probability and alias tables for Vose's alias method.
+
+    Each column `i` is chosen uniformly, and then either `i` is kept with
+    probability `probability[i]`, or `alias[i]` is taken instead."""
+
+    count = len(weights)
+    total = sum(weights)
+
+    scaled = [weight * count / total for weight in weights]
+    probability = [1.0] * count
+    alias = list(range(count))
+
+    small = [i for i, weight in enumerate(scaled) if weight < 1]
+    large = [i for i, weight in enumerate(scaled) if weight >= 1]
+
+    while small and large:
+        less = small.pop()
+        more = large.pop()
+
+        probability[less] = scaled[less]
+        alias[less] = more
+
+        scaled[more] -= 1 - scaled[less]
+        (small if scaled[more] < 1 else large).append(more)
+
+    # Anything left over is (up to rounding error) exactly full.
+    return probability, alias
@@ -15,6 +15,7 @@ import twitchio  # type: ignore
 from twitchio.ext import commands  # type: ignore
 
 from bot.commands import Command, MessageContext
+from bot.outbound import OutboundQueue
 from .basebot import BaseBot
 
 
@@ -22,6 +23,8 @@ from .basebot import BaseBot
 class TwitchBot(commands.Bot, BaseBot):  # type: ignore
     """The Twitch Bot"""
 
+    outbound: OutboundQueue
+
     def __init__(
         self,
         loop: asyncio.AbstractEventLoop,
@@ -35,6 +38,12 @@ class TwitchBot(commands.Bot, BaseBot):  # type: ignore
         )
         BaseBot.__init__(self, _commands)
 
+        # Twitch allows an account 20 messages per 30 seconds (5 + 30 / 2),
+        # and does not allow line breaks.
+        self.outbound = OutboundQueue(
+            interval=2, burst=5, max_length=500, separator=" ", per_channel=False
+        )
+
     async def event_ready(self) -> None:
         """When the Twitch bot connected."""
         print(f"Twitch Bot ready (user={self.nick})")
@@ -44,16 +53,18 @@ class TwitchBot(commands.Bot, BaseBot):  # type: ignore
         if not message.author or message.author.name == self.nick:
             return
 
-        await self.process(TwitchMessageContext(message), message.content)
+        await self.process(TwitchMessageContext(message, self.outbound), message.content)
 
 
 class TwitchMessageContext(MessageContext):
     """Twitch message context."""
 
     _message: twitchio.Message
+    _outbound: OutboundQueue
 
-    def __init__(self, message: twitchio.Message):
+    def __init__(self, message: twitchio.Message, outbound: OutboundQueue):
         self._message = message
+        self._outbound = outbound
 
     async def reply_direct(self, message: str) -> None:
         """Reply directly to the user who sent this message."""
@@ -61,7 +72,7 @@ class TwitchMessageContext(MessageContext):
 
     async def reply_all(self, message: str) -> None:
         """Reply to the channel this message was received in"""
-        await self._message.channel.send(message)
+        self._outbound.post(self._message.channel.name, self._message.channel.send, message)
 
     async def react(self) -> None:
         """React to the message, indicating successful processing."""
@@ -70,5 +81,13 @@ class TwitchMessageContext(MessageContext):
     def sender(self) -> str:
         return str(self._message.author.name)
 
+    def is_moderator(self) -> bool:
+        author = self._message.author
+        return bool(author.is_mod or author.is_broadcaster)
+
     def channel(self) -> str:
         return str(self._message.channel.name)
+
+    def channel_id(self) -> str:
+        # Twitch channel names are unique, as they are the broadcaster's name.
+        return self.channel()
@@ -8,50 +8,127 @@
 
 from __future__ import annotations
 
-from typing import Dict
+from typing import Awaitable, Callable, Deque, Dict, Generic, Optional, Tuple, TypeVar
 
+import abc
+import asyncio
+import collections
+import functools
 import random
-import requests
 
 import bot.commands
 
+from bot.http import get_json
 
-class Cat(bot.commands.SimpleCommand):
+
+T = TypeVar("T")
+
+
+class Prefetcher(Generic[T]):
+    """A small buffer of replies that have been fetched ahead of time.
+
+    Replies are taken from the buffer when one is ready, and fetched
+    directly when not. Taking a reply starts a background task to top the
+    buffer back up, so a burst of commands is answered straight away while
+    the API sees one request at a time from the refill."""
+
+    size: int
+    buffer: Deque[T]
+
+    _fetch: Callable[[], Awaitable[T]]
+    _refill: Optional[asyncio.Task[None]]
+
+    def __init__(self, fetch: Callable[[], Awaitable[T]], size: int = 3):
+        self.size = size
+        self.buffer = collections.deque()
+
+        self._fetch = fetch
+        self._refill = None
+
+    async def get(self) -> T:
+        """Gets a buffered reply, or fetches one if the buffer is empty."""
+
+        value = self.buffer.popleft() if self.buffer else await self._fetch()
+
+        self.refill()
+
+        return value
+
+    def refill(self) -> None:
+        """Starts refilling the buffer, if it is not already being refilled."""
+
+        if self._refill is None or self._refill.done():
+            self._refill = asyncio.get_running_loop().create_task(self._fill())
+
+    async def _fill(self) -> None:
+        # Stop after one attempt per missing reply, so an API that keeps
+        # returning nothing is not polled in a loop.
+        for _ in range(self.size - len(self.buffer)):
+            try:
+                value = await self._fetch()
+            except Exception as error:  # pylint: disable=broad-except
+                print("Unable to prefetch:", repr(error))
+                return
+
+            if value and len(self.buffer) < self.size:
+                self.buffer.append(value)
+
+
+class PrefetchCommand(bot.commands.AsyncSimpleCommand, abc.ABC):
+    """A command that replies with a value fetched from an API, which is
+    buffered ahead of time by a `Prefetcher`."""
+
+    buffer: Prefetcher[str]
+
+    def __init__(self, command: str, size: int = 3):
+        super().__init__(command)
+
+        self.buffer = Prefetcher(self.fetch, size)
+
+    async def reply(self) -> str:
+        return await self.buffer.get()
+
+    @abc.abstractmethod
+    async def fetch(self) -> str:
+        """Fetches a new reply from the API."""
+
+
+class Cat(PrefetchCommand):
     def __init__(self) -> None:
         super().__init__("cat")
 
-    def message(self) -> str:
-        data = requests.get(url="https://api.thecatapi.com/v1/images/search").json()
+    async def fetch(self) -> str:
+        data = await get_json("https://api.thecatapi.com/v1/images/search")
 
         return str(data[0]["url"]) if data else ""
 
 
-class Dog(bot.commands.SimpleCommand):
+class Dog(PrefetchCommand):
     def __init__(self) -> None:
         super().__init__("dog")
 
-    def message(self) -> str:
-        data = requests.get(url="https://api.thedogapi.com/v1/images/search").json()
+    async def fetch(self) -> str:
+        data = await get_json("https://api.thedogapi.com/v1/images/search")
 
         return str(data[0]["url"]) if data else ""
 
 
-class Fox(bot.commands.SimpleCommand):
+class Fox(PrefetchCommand):
     def __init__(self) -> None:
         super().__init__("fox")
 
-    def message(self) -> str:
-        data = requests.get(url="https://randomfox.ca/floof/").json()
+    async def fetch(self) -> str:
+        data = await get_json("https://randomfox.ca/floof/")
 
         return str(data["image"]) if data else ""
 
 
-class Bun(bot.commands.SimpleCommand):
+class Bun(PrefetchCommand):
     def __init__(self) -> None:
         super().__init__("bun")
 
-    def message(self) -> str:
-        data = requests.get(url="https://api.bunnies.io/v2/loop/random/?media=gif,png").json()
+    async def fetch(self) -> str:
+        data = await get_json("https://api.bunnies.io/v2/loop/random/?media=gif,png")
 
         return str(data["media"]["gif"])
 
@@ -63,9 +140,16 @@ class Panda(bot.commands.ParamCommand):
         "trash": "https://some-random-api.ml/animal/raccoon",
     }
 
+    buffers: Dict[str, Prefetcher[Optional[Tuple[str, str]]]]
+
     def __init__(self) -> None:
         super().__init__("panda", 0, 1)
 
+        self.buffers = {
+            panda_type: Prefetcher(functools.partial(self.fetch, url))
+            for panda_type, url in self.types.items()
+        }
+
     async def process_args(self, context: bot.commands.MessageContext, *args: str) -> bool:
         if not args:
             panda_type = random.choice(list(self.types.keys()))
@@ -78,19 +162,29 @@ class Panda(bot.commands.ParamCommand):
             )
             return True
 
-        url = self.types[panda_type]
-        data = requests.get(url=url).json()
+        panda = await self.buffers[panda_type].get()
 
-        if not data:
+        if not panda:
             return False
 
-        await context.reply_all(data["image"])
-        await context.reply_all(data["fact"])
+        image, fact = panda
+
+        await context.reply_all(image)
+        await context.reply_all(fact)
         return True
 
+    @staticmethod
+    async def fetch(url: str) -> Optional[Tuple[str, str]]:
+        data = await get_json(url)
+
+        if not data:
+            return None
+
+        return str(data["image"]), str(data["fact"])
+
 
-class Bird(bot.commands.SimpleCommand):
-    def message(self) -> str:
-        data = requests.get(url="https://some-random-api.ml/animal/bird").json()
+class Bird(PrefetchCommand):
+    async def fetch(self) -> str:
+        data = await get_json("https://some-random-api.ml/animal/bird")
 
         return str(data["image"]) if data else ""
@@ -8,7 +8,7 @@ import time
 
 import discord
 
-from bot.commands import Command, MessageContext
+from bot.commands import Command, MessageContext, ParsedMessage
 from bot.discord import DiscordMessageContext
 
 
@@ -85,13 +85,13 @@ class BadApplePlayer:
 
 
 class BadAppleCommand(Command):
-    def matches(self, message: str) -> bool:
-        return message == "!badapple"
+    def matches(self, message: ParsedMessage) -> bool:
+        return message.text == "!badapple"
 
-    async def process(self, context: MessageContext, message: str) -> bool:
+    async def process(self, context: MessageContext, message: ParsedMessage) -> bool:
         if not isinstance(context, DiscordMessageContext):
             return False
 
-        apple = await context.reply_all("🍎")
+        apple = await context.reply_message("🍎")
         asyncio.get_running_loop().create_task(BadApplePlayer(apple).play())
         return True
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2021 Benedict Harcourt <ben.harcourt@harcourtprogramming.co.uk>
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""Shared access to the Desert Bus for Hope donation totals"""
+
+from __future__ import annotations
+
+from typing import Callable, Deque, Dict, Hashable, Optional, Tuple
+
+import asyncio
+import collections
+import time
+
+import bot.commands
+
+from bot.http import CachedJson
+
+
+# The totals only need to be roughly live, but are requested by every
+# !busorder and !busstop while the event is running.
+TOTALS = CachedJson("https://desertbus.org/wapi/init", ttl=15, stale=60)
+
+# Computes a message from the total. The key is compared between polls,
+# and subscribers are only sent the message when the key changes.
+Announcement = Callable[[float], Tuple[Hashable, str]]
+
+
+async def total() -> float:
+    """Gets the amount raised so far, in dollars."""
+    return float((await TOTALS.get())["total"])
+
+
+class TotalsPoller:
+    """Polls the Desert Bus total in the background.
+
+    Each registered announcement is computed once per change in the total,
+    rather than once per command, and is pushed to the subscribed channels
+    when its key changes. Changes in the total are kept as a history.
+
+    The total is only polled while a channel is subscribed, or while the
+    announcements have been asked for in the last `idle` seconds, so that
+    the site is not polled all year."""
+
+    idle: float = 600
+
+    interval: float
+    history: Deque[Tuple[float, float]]
+    announcements: Dict[str, Announcement]
+    subscribers: Dict[Tuple[str, Hashable], bot.commands.MessageContext]
+
+    # The latest key and message for each announcement.
+    _latest: Dict[str, Tuple[Hashable, str]]
+    _polled: Optional[float]
+    _requested: Optional[float]
+
+    def __init__(self, interval: float = 30, history: int = 2880):
+        self.interval = interval
+        self.history = collections.deque(maxlen=history)
+        self.announcements = {}
+        self.subscribers = {}
+
+        self._latest = {}
+        self._polled = None
+        self._requested = None
+
+    def register(self, name: str, announcement: Announcement) -> None:
+        """Adds an announcement that is kept up to date by the poller."""
+        self.announcements[name] = announcement
+
+    def subscribe(self, context: bot.commands.MessageContext) -> bool:
+        """Subscribes the channel of a message to announcements.
+
+        Returns false if the channel was already subscribed."""
+
+        key = context.channel_key()
+
+        if key in self.subscribers:
+            return False
+
+        self.subscribers[key] = context
+
+        return True
+
+    def unsubscribe(self, context: bot.commands.MessageContext) -> bool:
+        """Unsubscribes the channel of a message from announcements.
+
+        Returns false if the channel was not subscribed."""
+        return self.subscribers.pop(context.channel_key(), None) is not None
+
+    async def run(self) -> None:
+        """Polls the total every `interval` seconds while it is wanted,
+        until cancelled."""
+
+        while True:
+            if self.wanted():
+                try:
+                    await self.poll()
+                except Exception as error:  # pylint: disable=broad-except
+                    print("Unable to poll Desert Bus total:", error)
+
+            await asyncio.sleep(self.interval)
+
+    async def poll(self) -> None:
+        """Fetches the total, and updates and pushes any announcements that
+        have changed since the last poll."""
+
+        amount = await total()
+        changed = not self.history or self.history[-1][1] != amount
+
+        self._polled = time.monotonic()
+
+        if not changed:
+            return
+
+        self.history.append((time.time(), amount))
+
+        for name, announcement in self.announcements.items():
+            key, message = announcement(amount)
+            previous = self._latest.get(name)
+            self._latest[name] = (key, message)
+
+            # Nothing is pushed on the first poll, as there is no change.
+            if previous is not None and previous[0] != key:
+                await self.push(message)
+
+    async def push(self, message: str) -> None:
+        """Sends a message to every subscribed channel."""
+
+        for context in list(self.subscribers.values()):
+            try:
+                await context.reply_all(message)
+            except Exception as error:  # pylint: disable=broad-except
+                print(f"Unable to push to {context.channel()}:", error)
+
+    async def message(self, name: str) -> str:
+        """Gets the latest message for an announcement.
+
+        This is the precomputed message if the poller is running, and is
+        otherwise computed from the (cached) total."""
+
+        self._requested = time.monotonic()
+
+        if name in self._latest and self.running():
+            return self._latest[name][1]
+
+        _, message = self.announcements[name](await total())
+
+        return message
+
+    def wanted(self) -> bool:
+        """Whether a channel is subscribed, or an announcement has been
+        asked for recently."""
+
+        if self.subscribers:
+            return True
+
+        return self._requested is not None and time.monotonic() - self._requested < self.idle
+
+    def running(self) -> bool:
+        """Whether the total has been polled recently."""
+        return self._polled is not None and time.monotonic() - self._polled < 2 * self.interval
+
+
+POLLER = TotalsPoller()
+
+
+class Subscribe(bot.commands.ParamCommand):
+    """Subscribes (or with "off", unsubscribes) a channel to Desert Bus updates.
+
+    Only the channel's moderators can do this."""
+
+    def __init__(self) -> None:
+        super().__init__("bussubscribe", 0, 1)
+
+    async def process_args(self, context: bot.commands.MessageContext, *args: str) -> bool:
+        if not context.is_moderator():
+            return False
+
+        if args and args[0].lower() == "off":
+            if POLLER.unsubscribe(context):
+                await context.reply_all("No more Desert Bus updates for this channel.")
+            return True
+
+        if args:
+            return False
+
+        if POLLER.subscribe(context):
+            await context.reply_all("This channel will now get Desert Bus updates.")
+
+        return True
@@ -8,35 +8,59 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, Generator, List, Union
+from typing import Any, Callable, Dict, Generator, Hashable, Iterable, List, Optional, Tuple
 
+import abc
+import bisect
+import decimal
+import functools
+import heapq
 import itertools
+import logging
 import math
-import requests
+import re
+import time
+
+from fractions import Fraction
 
 import bot.commands
 
+from commands import desertbus
+
+
+logger = logging.getLogger("order")
 
-Number = Union[float, int]
+# In lexicographic order, which the weed number search relies on.
+WEED_PARTS = ("420", "69")
+
+# Amounts of money are whole, or have up to two decimal places. Exponents
+# (which Decimal would accept) could otherwise ask for a number with
+# thousands of digits.
+AMOUNT = re.compile(r"^[0-9]{1,15}(\.[0-9]{1,2})?$")
+
+# Up to this length, the weed numbers are looked up in a precomputed table
+# (the longest has 1,897 entries); longer ones are searched for.
+WEED_TABLE_MAX_LENGTH = 30
 
 
 class DonationAmount:
+    """A suggested total to donate up to, in integer cents.
+
+    The sort key (the amount to donate per unit of coolness) is computed
+    once on creation, as targets are only ever compared by it."""
+
+    __slots__ = ("current", "total", "coolness", "key")
+
     current: int
     total: int
-    coolness: int
+    coolness: float
+    key: float
 
-    def __init__(self, current: int, total: int, coolness: int) -> None:
+    def __init__(self, current: int, total: int, coolness: float) -> None:
         self.current = current
         self.total = total
         self.coolness = coolness if coolness > 0 else 1
-
-    def value(self) -> float:
-        amount = self.total - self.current
-
-        if amount < 0:
-            return 999999.9
-
-        return amount / self.coolness
+        self.key = target_key(current, total, self.coolness)
 
     def __eq__(self, other: Any) -> bool:
         if not isinstance(other, DonationAmount):
@@ -44,96 +68,51 @@ class DonationAmount:
 
         return self.total == other.total and self.coolness == other.coolness
 
-    def __lt__(self, other: Any) -> bool:
-        if not isinstance(other, DonationAmount):
-            return NotImplemented
-
-        return self.value() < other.value()
-
-    def __le__(self, other: Any) -> bool:
-        if not isinstance(other, DonationAmount):
-            return NotImplemented
-
-        return self.value() <= other.value()
-
-    def __ge__(self, other: Any) -> bool:
-        if not isinstance(other, DonationAmount):
-            return NotImplemented
-
-        return self.value() >= other.value()
-
-    def __gt__(self, other: Any) -> bool:
-        if not isinstance(other, DonationAmount):
-            return NotImplemented
-
-        return self.value() > other.value()
-
-    def div(self, rvalue: float, true_current: float) -> DonationAmountFloat:
-        return DonationAmountFloat(true_current, self.total / rvalue, self.coolness)
-
     def __hash__(self) -> int:
         return self.total
 
     def __str__(self) -> str:
-        return f"${(self.total - self.current):,.2f} for ${self.total:,.2f}"
-
-
-class DonationAmountFloat:
-    current: float
-    total: float
-    coolness: int
-
-    def __init__(self, current: float, total: float, coolness: int) -> None:
-        self.current = current
-        self.total = total
-        self.coolness = coolness if coolness > 0 else 1
-
-    def value(self) -> float:
-        amount = self.total - self.current
-
-        if amount < 0:
-            return 999999.9
-
-        return amount / self.coolness
-
-    def __eq__(self, other: Any) -> bool:
-        if not isinstance(other, DonationAmountFloat):
-            return False
+        return f"${dollars(self.total - self.current)} for ${dollars(self.total)}"
 
-        return self.total == other.total and self.coolness == other.coolness
 
-    def __lt__(self, other: Any) -> bool:
-        if not isinstance(other, DonationAmountFloat):
-            return NotImplemented
+def target_key(current: int, total: int, coolness: float) -> float:
+    """Gets the amount to donate per unit of coolness, which targets are
+    ranked by (lowest first)."""
+    return (total - current) / coolness if total >= current else 999999.9
 
-        return self.value() < other.value()
 
-    def __le__(self, other: Any) -> bool:
-        if not isinstance(other, DonationAmountFloat):
-            return NotImplemented
+def dollars(cents: int) -> str:
+    """Formats an amount in cents as dollars, without rounding through a float."""
+    return f"{cents // 100:,}.{cents % 100:02d}"
 
-        return self.value() <= other.value()
 
-    def __ge__(self, other: Any) -> bool:
-        if not isinstance(other, DonationAmountFloat):
-            return NotImplemented
+# A candidate target total, and how cool it is.
+Candidate = Tuple[int, int]
+CandidateGenerator = Generator[Candidate, None, None]
+Pattern = Callable[[int], CandidateGenerator]
 
-        return self.value() >= other.value()
+# The registered patterns, the weight each one's coolness is scaled by, and
+# the only scale it is used at (if it is limited to one).
+PATTERNS: List[Tuple[Pattern, float, Optional[int]]] = []
 
-    def __gt__(self, other: Any) -> bool:
-        if not isinstance(other, DonationAmountFloat):
-            return NotImplemented
 
-        return self.value() > other.value()
+def pattern(weight: float = 1, scale: Optional[int] = None) -> Callable[[Pattern], Pattern]:
+    """Registers a function as a target pattern.
 
-    def __str__(self) -> str:
-        return f"${(self.total - self.current):,.2f} for ${self.total:,.2f}"
+    The function is given the minimum amount, and yields the targets above
+    it that fit the pattern. The coolness of each is scaled by `weight`.
+    With a `scale`, the pattern is only used for amounts in those units,
+    such as 100 for patterns that only make sense in whole dollars."""
 
+    def register(generator: Pattern) -> Pattern:
+        PATTERNS.append((generator, weight, scale))
+        return generator
 
-AmountGenerator = Generator[DonationAmount, None, None]
+    return register
 
 
-def target_round_number(current: int, actual: int) -> AmountGenerator:
+@pattern()
+def target_round_number(current: int) -> CandidateGenerator:
     current_str = str(current)
 
     for pos in range(0, math.ceil(len(current_str) / 2)):
@@ -143,14 +122,15 @@ def target_round_number(current: int, actual: int) -> AmountGenerator:
         target = int(target_str)
         target += 10**off
 
-        yield DonationAmount(actual, target, int(1.5 * off))
+        yield target, int(1.5 * off)
 
         target += 10**off
 
-        yield DonationAmount(actual, target, int(1.5 * off))
+        yield target, int(1.5 * off)
 
 
-def target_ascending_number(current: int, actual: int) -> AmountGenerator:
+@pattern()
+def target_ascending_number(current: int) -> CandidateGenerator:
     # current is in pence/cent, to make it an int.
 
     # This operation is not defined for numbers less than four digits.
@@ -163,10 +143,11 @@ def target_ascending_number(current: int, actual: int) -> AmountGenerator:
     target = int("".join([str(d) for d in digits]))
 
     if target > current:
-        yield DonationAmount(actual, target, 2 * len(current_str))
+        yield target, 2 * len(current_str)
 
 
-def target_descending_number(current: int, actual: int) -> AmountGenerator:
+@pattern()
+def target_descending_number(current: int) -> CandidateGenerator:
     # current is in pence/cent, to make it an int.
 
     # This operation is not defined for numbers less than four digits.
@@ -180,10 +161,11 @@ def target_descending_number(current: int, actual: int) -> AmountGenerator:
     target = int("".join([str(d) for d in digits]))
 
     if target > current:
-        yield DonationAmount(actual, target, 2 * len(current_str))
+        yield target, 2 * len(current_str)
 
 
-def target_repeating_number(current: int, actual: int) -> AmountGenerator:
+@pattern()
+def target_repeating_number(current: int) -> CandidateGenerator:
     current_str = str(current)
 
     for pos in range(math.ceil(len(current_str) / 2), len(current_str) + 1):
@@ -194,36 +176,79 @@ def target_repeating_number(current: int, actual: int) -> AmountGenerator:
 
         if target > current:
             cool = max(-1, pos - 3) + max(-1, off - 3)
-            yield DonationAmount(actual, target, 2 * cool if off > 0 else 3 * pos)
+            yield target, (2 * cool if off > 0 else 3 * pos)
+
+
+@pattern()
+def target_weed_number(
+    current: int, limit: int = 3, budget: float = 0.01
+) -> CandidateGenerator:
+    """Yields the smallest numbers with as many digits as `current`, but
+    larger, that are made up of 420s and 69s, smallest first.
 
+    At most `limit` numbers are yielded, and the search gives up after
+    `budget` seconds, so that very long inputs cannot stall the bot."""
 
-def target_weed_number(current: int, actual: int) -> AmountGenerator:
     length = len(str(current))
 
-    for sixty_nine_count in range(0, 1 + math.ceil(length / 2)):
-        space_left = length - 2 * sixty_nine_count
+    if length <= WEED_TABLE_MAX_LENGTH:
+        table = weed_table(length)
+        start = bisect.bisect_right(table, current)
+        end = start + limit
 
-        if space_left < 0:
-            break
+        for number in table[start:end]:
+            yield number, 20
 
-        four_twenty_count = math.ceil(space_left / 3)
+        return
 
-        space_left -= four_twenty_count * 3
+    deadline = time.monotonic() + budget
 
-        if space_left < 0:
-            continue
+    for target in itertools.islice(weed_numbers(str(current), "", deadline), limit):
+        yield int(target), 20
+
+
+@functools.lru_cache(maxsize=None)
+def weed_table(length: int) -> List[int]:
+    """Gets every number of the given length made up of 420s and 69s, in
+    order, so that the ones above an amount can be found by bisection.
+
+    Amounts of the same length share a table, which makes the search for
+    each amount a lookup."""
+    return [int(target) for target in weed_numbers("0" * length, "", math.inf)]
 
-        inputs = ([0] * four_twenty_count) + ([1] * sixty_nine_count)
 
-        for form in set(itertools.permutations(inputs, len(inputs))):
-            target_str = "".join(["69" if x else "420" for x in form])
-            target = int(target_str)
+def weed_numbers(current: str, prefix: str, deadline: float) -> Generator[str, None, None]:
+    """Yields the strings made of 420s and 69s that start with `prefix`, and
+    are the same length as, and greater than, `current`, in order.
 
-            if target > current:
-                yield DonationAmount(actual, target, 20)
+    This is a depth first search that tries 420 before 69, which gives
+    lexicographic (and so, for equal lengths, numeric) order. Branches
+    that fall below `current`, or that leave a single digit unfilled, are
+    pruned, so each yielded string costs at most a walk down the tree."""
 
+    remaining = len(current) - len(prefix)
 
-def target_alternating_number(current: int, actual: int) -> AmountGenerator:
+    if remaining == 0:
+        if prefix > current:
+            yield prefix
+        return
+
+    if time.monotonic() > deadline:
+        return
+
+    for part in WEED_PARTS:
+        # Any remaining length except one can be filled with 420s and 69s.
+        if len(part) > remaining or remaining - len(part) == 1:
+            continue
+
+        candidate = prefix + part
+
+        if candidate >= current[: len(candidate)]:
+            yield from weed_numbers(current, candidate, deadline)
+
+
+@pattern()
+def target_alternating_number(current: int) -> CandidateGenerator:
     # current is in pence/cent, to make it an int.
 
     # This operation is not defined for numbers less than four digits.
@@ -236,138 +261,201 @@ def target_alternating_number(current: int, actual: int) -> AmountGenerator:
     target = int(target_str[: len(current_str)])
 
     if target > current:
-        yield DonationAmount(actual, target, 2 * len(current_str) - 1)
+        yield target, 2 * len(current_str) - 1
+
+
+# Palindromes are common enough that one is always close by, so they
+# count for much less than the rarer patterns. As with round numbers, only
+# the upper half of the amount is changed, as the next palindrome with the
+# same upper half is only a few units more; and they are only used for
+# whole dollar amounts, where the units are not so small.
+@pattern(weight=0.03, scale=100)
+def target_palindrome_number(current: int) -> CandidateGenerator:
+    # Two digit palindromes are already repeating numbers.
+    if current < 100:
+        return
 
+    current_str = str(current)
+    half = current_str[: (len(current_str) + 1) // 2]
+    left = str(int(half) + 1)
 
-def get_targets(min_amount: int, amount: int) -> List[DonationAmount]:
-    potential: Dict[int, DonationAmount] = {}
+    if len(left) > len(half):
+        # 99...9 rolled over; the next palindrome is 10...01.
+        yield 10 ** len(current_str) + 1, len(current_str) + 1
+        return
 
-    for target in itertools.chain(
-        target_ascending_number(min_amount, amount),
-        target_descending_number(min_amount, amount),
-        target_alternating_number(min_amount, amount),
-        target_round_number(min_amount, amount),
-        target_repeating_number(min_amount, amount),
-        target_weed_number(min_amount, amount),
-    ):
+    # Mirror the left half (without the middle digit for odd lengths).
+    yield int(left + left[: len(current_str) // 2][::-1]), len(current_str)
 
-        if target.total in potential:
-            potential[target.total].coolness = max(
-                potential[target.total].coolness, target.coolness
-            )
-        else:
-            potential[target.total] = target
 
-    targets = list(potential.values())
-    targets.sort()
+# Dates are only whole dollar amounts, as otherwise nearly every amount
+# under $12.31 is one cent from a date. Even then, nearly every amount
+# from $1,001 to $1,231 is a dollar from one, so they count for little.
+@pattern(weight=0.01, scale=100)
+def target_date_number(current: int) -> CandidateGenerator:
+    # Amounts that read as a four digit month and day, such as 1031 or 1225.
+    # Only four digit amounts are offered one; for smaller amounts, the
+    # next date would be many times the amount.
+    if current < 1000:
+        return
 
-    print(f"Preview for {amount}")
-    for target in targets:
-        print(f"{target.total:8d}  {target.coolness:4d}  {target.value():6,.0f}")
-    print()
+    index = bisect.bisect_right(DATES, current)
 
-    return targets
+    if index < len(DATES):
+        yield DATES[index], 3
 
 
-class TeamOrder(bot.commands.ParamCommand):
-    def __init__(self) -> None:
-        super().__init__("order", 1, 1)
+# Every month and day in the last three months (the ones with four digits)
+# as a number, in order.
+DATES = [
+    month * 100 + day
+    for month, days in [(10, 31), (11, 30), (12, 31)]
+    for day in range(1, days + 1)
+]
 
-    async def process_args(self, context: bot.commands.MessageContext, *args: str) -> bool:
-        targets: Union[List[DonationAmount], List[DonationAmountFloat]]
 
-        if "." in args[0]:
-            amount = float(args[0])
-            target = get_targets(round(100 * amount), round(100 * amount))
-            targets = [x.div(100, amount) for x in target]
+def find_targets(
+    min_amount: int, amount: int, scale: int = 1, limit: int = 3
+) -> Tuple[DonationAmount, ...]:
+    """Gets the best `limit` targets above `min_amount`, best first.
 
-        else:
-            amount = int(args[0])
-            targets = get_targets(amount, amount)
+    The patterns are applied to the digits of `min_amount`, which is in
+    units of `scale` cents: 100 to find cool dollar amounts, or 1 to find
+    cool amounts including the cents."""
 
-        # Show three at most.
-        targets = targets[0:3]
-        targets.sort(key=lambda a: a.total)
-        output = "Donate " + ", or ".join([str(t) for t in targets[0:3]])
+    coolness: Dict[int, float] = {}
 
-        await context.reply_all(output)
+    # Where patterns produce the same total, the coolest wins.
+    for generator, weight, only in PATTERNS:
+        if only is not None and only != scale:
+            continue
 
-        return True
+        for total, cool in generator(min_amount):
+            weighted = max(cool, 1) * weight
+            coolness[total] = max(coolness.get(total, 0), weighted)
 
+    # Only the best few are kept, so a heap is used rather than sorting
+    # every candidate, and only those few are made in to targets.
+    current = amount * scale
+    best = heapq.nsmallest(
+        limit,
+        coolness.items(),
+        key=lambda candidate: target_key(current, candidate[0] * scale, candidate[1]),
+    )
+    targets = [DonationAmount(current, total * scale, cool) for total, cool in best]
 
-class TeamOrderDonate(bot.commands.ParamCommand):
-    def __init__(self) -> None:
-        super().__init__("order_donate", 1, 1)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Preview for %d\n%s",
+            amount,
+            "\n".join(f"{t.total:8d}  {t.coolness:4g}  {t.key:6,.0f}" for t in targets),
+        )
+
+    return tuple(targets)
+
+
+# The results are cached, as the same amounts are often asked for
+# repeatedly, so the returned targets must not be modified.
+get_targets = functools.lru_cache(maxsize=1024)(find_targets)
 
-    async def process_args(self, context: bot.commands.MessageContext, *args: str) -> bool:
-        targets: Union[List[DonationAmount], List[DonationAmountFloat]]
 
-        if "." in args[0]:
-            amount = float(args[0])
-            # Minimum increment is 5 units
-            min_amount = amount + 5
-            target = get_targets(round(100 * min_amount), round(100 * amount))
-            targets = [x.div(100, amount) for x in target]
+def suggest(targets: Iterable[DonationAmount]) -> str:
+    """Suggests the best three targets, in order of their totals."""
 
-        else:
-            amount = int(args[0])
-            # Minimum increment is 1% or 5 units
-            min_amount = amount + 5
-            targets = get_targets(min_amount, amount)
+    best = sorted(itertools.islice(targets, 3), key=lambda target: target.total)
 
-        # Show three at most.
-        targets = targets[0:3]
-        targets.sort(key=lambda a: a.total)
-        output = "Donate " + ", or ".join([str(t) for t in targets[0:3]])
+    return "Donate " + ", or ".join([str(t) for t in best])
 
-        await context.reply_all(output)
+
+def parse_amount(text: str) -> Tuple[int, int]:
+    """Parses an amount of money into cents, and the scale (in cents) to
+    look for cool amounts at.
+
+    Amounts with a decimal point are matched to the cent, and whole
+    amounts to the dollar. Anything else raises a ValueError."""
+
+    if not AMOUNT.match(text):
+        raise ValueError(f"Not an amount of money: {text!r}")
+
+    if "." in text:
+        return round(decimal.Decimal(text) * 100), 1
+
+    return int(text) * 100, 100
+
+
+class OrderCommand(bot.commands.ParamCommand, abc.ABC):
+    """Suggests cool totals to donate up to, from the current total."""
+
+    def __init__(self, command: str) -> None:
+        super().__init__(command, 1, 1)
+
+    async def process_args(self, context: bot.commands.MessageContext, *args: str) -> bool:
+        try:
+            amount, scale = parse_amount(args[0])
+        except ValueError:
+            return False
+
+        # Targets are above the minimum, to the nearest whole unit of the scale.
+        minimum = round(self.minimum(amount, scale) / scale)
+        targets = get_targets(minimum, amount // scale, scale)
+
+        await context.reply_all(suggest(targets))
 
         return True
 
+    @abc.abstractmethod
+    def minimum(self, amount: int, scale: int) -> Fraction:
+        """Gets the minimum total, in cents, that can follow `amount` cents.
+
+        The scale is 1 for amounts given to the cent, and 100 for whole
+        dollar amounts."""
 
-class TeamOrderBid(bot.commands.ParamCommand):
+
+class TeamOrder(OrderCommand):
     def __init__(self) -> None:
-        super().__init__("order_bid", 1, 1)
+        super().__init__("order")
 
-    async def process_args(self, context: bot.commands.MessageContext, *args: str) -> bool:
-        targets: Union[List[DonationAmount], List[DonationAmountFloat]]
+    def minimum(self, amount: int, scale: int) -> Fraction:
+        return Fraction(amount)
 
-        if "." in args[0]:
-            amount = float(args[0])
-            # Minimum increment is 5 units
-            min_amount = max(amount * 1.01, amount + 5)
-            target = get_targets(round(100 * min_amount), round(100 * amount))
-            targets = [x.div(100, amount) for x in target]
 
-        else:
-            amount = int(args[0])
-            # Minimum increment is 1% or 5 units
-            min_amount = round(min(amount * 1.01, amount + 5))
-            targets = get_targets(min_amount, amount)
+class TeamOrderDonate(OrderCommand):
+    def __init__(self) -> None:
+        super().__init__("order_donate")
 
-        # Show three at most.
-        targets = targets[0:3]
-        targets.sort(key=lambda a: a.total)
-        output = "Donate " + ", or ".join([str(t) for t in targets[0:3]])
+    def minimum(self, amount: int, scale: int) -> Fraction:
+        # Minimum increment is 5 units
+        return Fraction(amount + 500)
 
-        await context.reply_all(output)
 
-        return True
+class TeamOrderBid(OrderCommand):
+    def __init__(self) -> None:
+        super().__init__("order_bid")
+
+    def minimum(self, amount: int, scale: int) -> Fraction:
+        # Minimum increment is 1% or 5 units; the larger of the two for
+        # amounts to the cent, and the smaller for whole amounts.
+        if scale == 1:
+            return max(Fraction(amount * 101, 100), Fraction(amount + 500))
 
+        return min(Fraction(amount * 101, 100), Fraction(amount + 500))
 
-class DesertBusOrder(bot.commands.SimpleCommand):
+
+class DesertBusOrder(bot.commands.AsyncSimpleCommand):
     def __init__(self) -> None:
         super().__init__("busorder")
 
-    def message(self) -> str:
-        data = requests.get("https://desertbus.org/wapi/init").json()
-        amount = round(100 * data["total"])
+        desertbus.POLLER.register(self._command, self.announcement)
+
+    async def reply(self) -> str:
+        return await desertbus.POLLER.message(self._command)
 
-        target = get_targets(amount, amount)
-        targets = [x.div(100, amount / 100) for x in target]
+    @staticmethod
+    def announcement(total: float) -> Tuple[Hashable, str]:
+        amount = round(100 * total)
+        targets = get_targets(amount, amount)
 
-        # Show three at most.
-        targets = targets[0:3]
-        targets.sort(key=lambda a: a.total)
+        # Only announce when the targets change, not the amount left.
+        key = tuple(sorted(t.total for t in targets[:3]))
 
-        return "Donate " + ", or ".join([str(t) for t in targets])
+        return key, suggest(targets)
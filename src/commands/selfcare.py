@@ -10,6 +10,7 @@ from __future__ import annotations
 
 import random
 
+from bot.templates import WeightedTemplates
 import bot.commands
 
 # Bad Selfcare Actions
@@ -37,16 +38,16 @@ BAD_SELF_CARE_IDEAS = list(
     }.items()
 )
 
-BAD_SELF_CARE_TEMPLATES = [
-    "{verb} {act_on}?",
-    "{verb} {act_on}?",
-    "{verb} {act_on}?",
-    "In the words of a Cursed little kitty: {verb} {act_on}?",
-    "Kitsune says: {verb} {act_on}?",
-    "Kitteh says: {verb} {act_on}!",
-    "Reminder to: {verb} {act_on}?",
-    "Time to {verb} {act_on}?",
-]
+BAD_SELF_CARE_TEMPLATES = WeightedTemplates(
+    [
+        ("{verb} {act_on}?", 3),
+        ("In the words of a Cursed little kitty: {verb} {act_on}?", 1),
+        ("Kitsune says: {verb} {act_on}?", 1),
+        ("Kitteh says: {verb} {act_on}!", 1),
+        ("Reminder to: {verb} {act_on}?", 1),
+        ("Time to {verb} {act_on}?", 1),
+    ]
+)
 
 
 class BadSelfCare(bot.commands.SimpleCommand):
@@ -58,6 +59,4 @@ class BadSelfCare(bot.commands.SimpleCommand):
     def message(self) -> str:
         [verb, _], [_, act_on] = random.sample(list(BAD_SELF_CARE_IDEAS), k=2)
 
-        template = random.choice(BAD_SELF_CARE_TEMPLATES)
-
-        return template.format(verb=verb, act_on=act_on).capitalize()
+        return BAD_SELF_CARE_TEMPLATES.format(verb=verb, act_on=act_on).capitalize()
@@ -7,17 +7,17 @@
 """Self care commands"""
 
 from __future__ import annotations
-from typing import List
+from typing import Hashable, List, Tuple
 
 import datetime
 import math
 import random
 import time
 
-import requests
-
 import bot.commands
 
+from commands import desertbus
+
 
 MOONBASE_TIME = datetime.timezone(-datetime.timedelta(hours=8), "Canada/Pacific")
 
@@ -137,20 +137,26 @@ class March(bot.commands.SimpleCommand):
         return f"Today is {dow}, {date}{suffix} of {month} 2020"
 
 
-class BusStop(bot.commands.SimpleCommand):
+class BusStop(bot.commands.AsyncSimpleCommand):
     def __init__(self) -> None:
         super().__init__("busstop")
 
+        desertbus.POLLER.register(self._command, self.announcement)
+
     @staticmethod
     def hours(amount: float) -> float:
         return math.log(amount + 14.2857, 1.07) - math.log(15.2857, 1.07) + 1
 
-    def message(self) -> str:
-        amount = requests.get("https://desertbus.org/wapi/init").json()["total"]
+    async def reply(self) -> str:
+        return await desertbus.POLLER.message(self._command)
+
+    @staticmethod
+    def announcement(amount: float) -> Tuple[Hashable, str]:
         hours = BusStop.hours(amount)
 
         end = time.mktime(BUS_START.utctimetuple())
         end += round(3600 * hours)
         end = int(end)
 
-        return f"The next bus stop on the time table is <t:{end}:R>!"
+        # Only announce when the bus gains another hour.
+        return math.floor(hours), f"The next bus stop on the time table is <t:{end}:R>!"
@@ -16,7 +16,9 @@ from bot.twitch import TwitchMessageContext
 
 
 class TwitchCommand(bot.commands.Command):
-    async def process(self, context: bot.commands.MessageContext, message: str) -> bool:
+    async def process(
+        self, context: bot.commands.MessageContext, message: bot.commands.ParsedMessage
+    ) -> bool:
         if isinstance(context, TwitchMessageContext):
             if str(context.channel()) != "sugarsh0t":
                 return False
@@ -24,37 +26,45 @@ class TwitchCommand(bot.commands.Command):
         return await self.respond(context, message)
 
     @abc.abstractmethod
-    async def respond(self, context: bot.commands.MessageContext, message: str) -> bool:
+    async def respond(
+        self, context: bot.commands.MessageContext, message: bot.commands.ParsedMessage
+    ) -> bool:
         pass
 
 
 class SassPlan(TwitchCommand):
-    async def respond(self, context: bot.commands.MessageContext, message: str) -> bool:
+    triggers = (
+        "!sassplan",
+        "!flan",
+        "!phlan",
+        "!cheesecake",
+        "!sassflan",
+        "!sasscheesecake",
+        "!sassfondue",
+        "!sassphlan",
+    )
+
+    async def respond(
+        self, context: bot.commands.MessageContext, message: bot.commands.ParsedMessage
+    ) -> bool:
         user = "@" + context.sender()
 
         await context.reply_all("This ain't a Serge stream, " + user)
         return True
 
-    def matches(self, message: str) -> bool:
-        return (
-            message.startswith("!sassplan")
-            or message.startswith("!flan")
-            or message.startswith("!phlan")
-            or message.startswith("!cheesecake")
-            or message.startswith("!sassflan")
-            or message.startswith("!sasscheesecake")
-            or message.startswith("!sassfondue")
-            or message.startswith("!sassphlan")
-        )
+    def matches(self, message: bot.commands.ParsedMessage) -> bool:
+        return message.text.startswith(self.triggers)
 
 
 class Cardinal(TwitchCommand):
     def __init__(self) -> None:
         self.regexp = re.compile("^!(north|east|south|west)+($| )")
 
-    def matches(self, message: str) -> bool:
-        return bool(self.regexp.match(message))
+    def matches(self, message: bot.commands.ParsedMessage) -> bool:
+        return bool(self.regexp.match(message.text))
 
-    async def respond(self, context: bot.commands.MessageContext, message: str) -> bool:
+    async def respond(
+        self, context: bot.commands.MessageContext, message: bot.commands.ParsedMessage
+    ) -> bool:
         await context.reply_all("East... always into the East!")
         return True
@@ -8,54 +8,49 @@
 
 from __future__ import annotations
 
-from typing import List
+from typing import List, Optional, Tuple
 
-import random
 import re
 
-from bot.commands import MessageContext
+from bot.commands import MessageContext, ParsedMessage
 from bot.discord import DiscordMessageContext
+from bot.templates import WeightedTemplates
 from eorzea.storage import DataStore
 import bot.commands
 
-PARTY_QUOTES = [
-    "{names} are pray returning to the Waking Sands",
-    "{names} are pray returning to the Waking Sands",
-    "{names} are pray returning to the Waking Sands",
-    "{names} are pray returning to the Waking Sands",
-    "{names} are pray returning to the Waking Sands",
-    "{leader} has been captured by the Garleans. Can {followers} save them?",
-    "{leader} has been captured by the Garleans. Can {followers} save them?",
-    "{leader} has been captured by the Garleans. Can {followers} save them?",
-    "{leader} has been captured by the Garleans. Can {followers} save them?",
-    "{leader} has been captured by the Garleans. Can {followers} save them?",
-    "Hail the Scions of the Eight Dawn: {names}",
-    "Hail the Scions of the Eight Dawn: {names}",
-    "Hail the Scions of the Eight Dawn: {names}",
-    "Omega is testing {names} in the rift.",
-]
-
-SINGLE_QUOTES = [
-    "{name}, you are Eorzea's only hope!",
-    "{name}, you are Eorzea's only hope!",
-    "{name}, you are Eorzea's only hope!",
-    "{name}, you are Eorzea's only hope!",
-    "{name}, you are Eorzea's only hope!",
-    "{name}, you are Eorzea's only hope!",
-    "{name}, you are Eorzea's only hope!",
-    "{name}, you are Eorzea's only hope!",
-    "{name}, you are Eorzea's only hope!",
-    "{name}, you are Eorzea's only hope!",
-    "{name}, you are the Namazu's only hope!",
-    "{name}, you are the Namazu's only hope!",
-    "{name}, you are the Namazu's only hope!",
-    "{name} is a cat, a kitty cat. And they dance dance dance, and they dance dance dance",
-    "Warrior of Light {name} rides again!",
-    "Help me {name}, you're my only hope!",
-]
+PARTY_QUOTES = WeightedTemplates(
+    [
+        ("{names} are pray returning to the Waking Sands", 5),
+        ("{leader} has been captured by the Garleans. Can {followers} save them?", 5),
+        ("Hail the Scions of the Eight Dawn: {names}", 3),
+        ("Omega is testing {names} in the rift.", 1),
+    ]
+)
+
+SINGLE_QUOTES = WeightedTemplates(
+    [
+        ("{name}, you are Eorzea's only hope!", 10),
+        ("{name}, you are the Namazu's only hope!", 3),
+        (
+            "{name} is a cat, a kitty cat. And they dance dance dance, and they dance dance dance",
+            1,
+        ),
+        ("Warrior of Light {name} rides again!", 1),
+        ("Help me {name}, you're my only hope!", 1),
+    ]
+)
 
 COMMANDS = 0
 
+# Discord's limit is 2000 characters; leave some room for safety.
+MESSAGE_LIMIT = 1998
+
+# The length of each party template without any names in it.
+PARTY_OVERHEAD = [
+    len(template.format(names="", leader="", followers=""))
+    for template in PARTY_QUOTES.templates
+]
+
 
 class Stats(bot.commands.SimpleCommand):
     """!onlyhope yields one name"""
@@ -75,42 +70,62 @@ class HopeAdder(bot.commands.Command):
 
     _storage: DataStore
     _pattern: re.Pattern[str]
+    _last: Tuple[Optional[ParsedMessage], List[str]]
 
     def __init__(self, data: DataStore):
         self._storage = data
         self._pattern = re.compile(" you[^ ]*(?: are)? [^ ]+zea'?s only hope", re.IGNORECASE)
+        self._last = (None, [])
 
-    def matches(self, message: str) -> bool:
-        """Checks if this message is a candidate for having a new hero"""
-        if self._pattern.search(message):
-            return True
+    def names(self, message: ParsedMessage) -> List[str]:
+        """Extracts the names of new heroes from each line of a message.
 
-        return any(x for x in message.split("\n") if x.startswith("!onlyhope "))
+        This is run for every message the bot sees, so messages without
+        "hope" in them (which covers both the phrase and the command) are
+        skipped without running the regex. The result for the most recent
+        message is kept, so that `process` can reuse the work `matches` did."""
 
-    async def process(self, context: MessageContext, message: str) -> bool:
-        """Handle the command in the message"""
-        if not isinstance(context, DiscordMessageContext):
-            return False
+        if self._last[0] is message:
+            return self._last[1]
+
+        names: List[str] = []
+
+        if "hope" in message.lower:
+            for line in message.lines:
+                match = self._pattern.search(line)
 
-        name = ""
-        result = False
+                if match:
+                    name = line[: match.start()]
+                elif line.lower().startswith("!onlyhope "):
+                    name = line[9:]
+                else:
+                    continue
 
-        for line in message.split("\n"):
-            if self._pattern.search(line):
-                [name, _] = message.split(" you", 1)
-            elif line.lower().startswith("!onlyhope"):
-                name = line[9:]
+                name = name.strip()
 
-            name = name.strip()
+                if name:
+                    names.append(name)
 
-            if not name:
-                continue
+        self._last = (message, names)
 
-            result = True
+        return names
+
+    def matches(self, message: ParsedMessage) -> bool:
+        """Checks if this message is a candidate for having a new hero"""
+        return bool(self.names(message))
+
+    async def process(self, context: MessageContext, message: ParsedMessage) -> bool:
+        """Handle the command in the message"""
+        if not isinstance(context, DiscordMessageContext):
+            return False
+
+        names = self.names(message)
+
+        for name in names:
             if self._storage.add(name, context.sender(), context.channel()):
                 await context.react()
 
-        return result
+        return bool(names)
 
 
 class OnlyHope(bot.commands.SimpleCommand):
@@ -123,7 +138,7 @@ class OnlyHope(bot.commands.SimpleCommand):
         self._data = data
 
     def message(self) -> str:
-        return random.choice(SINGLE_QUOTES).format(name=self._data.random().name)
+        return SINGLE_QUOTES.format(name=self._data.random().name)
 
 
 class Party(bot.commands.ParamCommand):
@@ -144,24 +159,37 @@ class Party(bot.commands.ParamCommand):
         else:
             count = 4
 
-        names = [self._storage.random() for _ in range(count)]
+        index = PARTY_QUOTES.index()
+        template = PARTY_QUOTES.templates[index]
+
+        # The template's own text, plus the longer ", and " of the last name.
+        budget = MESSAGE_LIMIT - PARTY_OVERHEAD[index] - 4
+        names: List[str] = []
+
+        # Names past the message limit would be cut off anyway, so stop
+        # adding them once it is reached (allowing for the ", " separator).
+        for record in self._storage.sample(count):
+            budget -= len(record.name) + 2
+
+            if budget < 0 and len(names) >= 2:
+                break
 
-        leader: str = names[0].name
-        followers: str = combine_name_list([x.name for x in names[1:]])
-        name: str = combine_name_list([x.name for x in names])
+            names.append(record.name)
 
-        message = random.choice(PARTY_QUOTES).format(
-            names=name, leader=leader, followers=followers
+        message = template.format(
+            names=combine_name_list(names),
+            leader=names[0],
+            followers=combine_name_list(names[1:]),
         )
 
-        await context.reply_all(message[0:1998])
+        await context.reply_all(message[0:MESSAGE_LIMIT])
 
         return True
 
 
 def combine_name_list(names: List[str]) -> str:
     """Combines a list of names in the English comma, and format."""
-    if len(names) == 1:
-        return names[0]
+    if len(names) <= 1:
+        return "".join(names)
 
     return ", ".join(names[:-1]) + ", and " + names[-1]
@@ -12,11 +12,12 @@ from typing import Dict, List, Tuple
 from collections import defaultdict
 
 import datetime
-import requests
 import discord
 
 import bot.commands
 
+from bot.http import get_json
+
 from bot.discord import DiscordMessageContext
 
 
@@ -51,7 +52,7 @@ class PlayerLookup(bot.commands.ParamCommand):
             results = [int(args[0])]
 
         for character_id in results:
-            data = requests.get("https://xivapi.com/character/" + str(character_id)).json()
+            data = await get_json("https://xivapi.com/character/" + str(character_id))
 
             embed = discord.Embed(
                 title=data["Character"]["Name"],
@@ -97,10 +98,10 @@ class PlayerLookup(bot.commands.ParamCommand):
         server: str,
         force_all: bool,
     ) -> List[int]:
-        results = requests.get(
+        results = await get_json(
             "https://xivapi.com/character/search",
             params={"name": name, "server": server, "private_key": self.key},
-        ).json()
+        )
 
         total = results["Pagination"]["ResultsTotal"]
         if total < len(results["Results"]):
@@ -10,7 +10,9 @@ from __future__ import annotations
 
 from .datastore import DataStore
 from .filestore import FileStore
+from .journal import JournalStore
+from .moderation import ModerationQueue
 from .sqlite import SQLite
 
 
-__all__ = ["DataStore", "FileStore", "SQLite"]
+__all__ = ["DataStore", "FileStore", "JournalStore", "ModerationQueue", "SQLite"]
@@ -20,6 +20,7 @@ from typing import Any, Dict, List, Optional, Set, Type
 from random import SystemRandom
 
 from .record import Record
+from .similarity import NameIndex
 
 
 RaiseType = Optional[Type[Exception]]
@@ -36,28 +37,37 @@ class DataStore(ABC):
     """
 
     known: Optional[Dict[str, Record]]
+    index: NameIndex
     rand: SystemRandom = SystemRandom()
     seen: Set[str]
 
-    def __init__(self, values: Optional[List[Record]] = None):
+    def __init__(self, values: Optional[List[Record]] = None, fuzzy: bool = False):
         """Sets up the data store, with the initial set of data that was
-        loaded out of the data store"""
+        loaded out of the data store.
+
+        The known values are indexed to detect near-duplicates; `fuzzy`
+        additionally indexes them to find similar names."""
         super().__init__()
 
         # store the initial set of values.
-        self.known = {r.name: r for r in values} if values else None
+        self.known = {r.name: r for r in values} if values is not None else None
+        self.index = NameIndex(self.known or (), fuzzy)
         self.seen = set()
         self.rand = SystemRandom()
 
     def add(self, value: str, added_by: str, added_from: str) -> bool:
         """Adds a value to the DataStore.
 
-        If this value is already in the store, this function is a no-op that
-        will always return true.
+        If this value, or a near-duplicate of it differing only in case,
+        accents, punctuation or spacing, is already in the store, this
+        function is a no-op that will always return true.
 
         Otherwise, this function will return true if the data is successfully
         written to both the in-memory storage and to the backing store."""
-        if self.known and value in self.known:
+        if self.known is not None and value in self.known:
+            return True
+
+        if self.index.find(value) is not None:
             return True
 
         record = Record(value, added_by, added_from)
@@ -68,11 +78,18 @@ class DataStore(ABC):
         if self._write_append(record) in [False]:
             return False
 
-        if self.known:
+        if self.known is not None:
             self.known[record.name] = record
+            self.index.add(record.name)
 
         return True
 
+    def similar(self, value: str) -> List[str]:
+        """Finds known names that are a typo away from this value.
+
+        This requires the store to have been created with fuzzy indexing."""
+        return self.index.similar(value)
+
     def random(self) -> Record:
         """Selects a random element from this store."""
 
@@ -84,6 +101,17 @@ class DataStore(ABC):
 
         return record
 
+    def sample(self, count: int) -> List[Record]:
+        """Selects up to `count` distinct random elements from this store."""
+
+        if not self.known:
+            raise Exception("Empty storage")
+
+        records = self.rand.sample(list(self.known.values()), min(count, len(self.known)))
+        self.seen.update(record.name for record in records)
+
+        return records
+
     @abstractmethod
     def _write_append(self, record: Record) -> Optional[bool]:
         """Append a value to the underlying data store this type implements.
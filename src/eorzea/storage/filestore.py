@@ -9,32 +9,43 @@ with one entry per line"""
 
 from __future__ import annotations
 
-from typing import Any, List, Optional, TextIO
+from typing import Any, Generator, List, Optional, TextIO
 from os.path import exists as path_exists
 
 from .datastore import DataStore, RaiseType
 from .record import Record
 
 
+# Approximate number of bytes of lines to read from the file at once.
+READ_CHUNK_SIZE = 1 << 20
+
+FIELD_COUNT = 5
+
+
 class FileStore(DataStore):
     """A data store of names of people who can save Eorzea, written to a file
     with one entry per line"""
 
     file_handle: TextIO
+    compact: bool
 
-    def __init__(self, file_name: str):
+    def __init__(self, file_name: str, compact: bool = False):
         """Sets up the data store, reading the data set
-        from the file if needed"""
+        from the file if needed.
+
+        Files may mix ISO 8601 and epoch timestamps; `compact` only controls
+        which is used for newly written records."""
 
         from_storage: Optional[List[Record]] = None
 
         if path_exists(file_name):
             with open(file_name, "rt", encoding="utf-8") as handle:
-                lines = [line.strip() for line in handle]
-                from_storage = [Record.from_strings(*p.split("\t")) for p in lines]
+                from_storage = list(read_records(handle))
 
         super().__init__(from_storage)
 
+        self.compact = compact
+
         # pylint: disable=consider-using-with
         self.file_handle = open(file_name, "a", encoding="utf-8")
 
@@ -47,7 +58,9 @@ class FileStore(DataStore):
         Values passed to this function SHOULD NOT exist in the store already,
         so the implement does not need to consider de-duplication.
         """
-        return self.file_handle.write(f"{record}\n") > 0
+        line = "\t".join(record.to_strings(self.compact))
+
+        return self.file_handle.write(line + "\n") > 0
 
     def _write_list(self, _: List[Record]) -> Optional[bool]:
         return None
@@ -58,3 +71,24 @@ class FileStore(DataStore):
         self.file_handle.close()
 
         return super().__exit__(exception_type, message, traceback)
+
+
+def read_records(handle: TextIO) -> Generator[Record, None, None]:
+    """Streams the records out of an open file, a chunk of lines at a time.
+
+    Lines that do not have the expected number of fields, such as a partial
+    line left by an interrupted write, are skipped."""
+
+    from_strings = Record.from_strings
+
+    while True:
+        lines = handle.readlines(READ_CHUNK_SIZE)
+
+        if not lines:
+            return
+
+        for line in lines:
+            fields = line.rstrip("\n").split("\t")
+
+            if len(fields) == FIELD_COUNT:
+                yield from_strings(*fields)
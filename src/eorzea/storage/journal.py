@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2021 Benedict Harcourt <ben.harcourt@harcourtprogramming.co.uk>
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""
+A data store of names of people who can save Eorzea, persisted as a
+snapshot file and an append-only journal of records added since.
+
+Each journal entry is framed with its length and a CRC32 checksum, so a
+partially written entry at the end of the journal (from a crash or power
+loss) is detected and discarded on start up. Compaction moves the journal
+aside, writes a new snapshot, then removes the old journal; at every step
+the snapshot plus whichever journals exist hold the complete list.
+"""
+
+from __future__ import annotations
+
+from typing import Any, BinaryIO, Dict, List, Optional
+
+import asyncio
+import os
+import struct
+import zlib
+
+from .datastore import DataStore, RaiseType
+from .filestore import read_records
+from .record import Record
+
+
+# Journal entry header: payload length, and CRC32 of the payload.
+HEADER = struct.Struct("<II")
+
+
+class JournalStore(DataStore):
+    """A data store of names of people who can save Eorzea, persisted as a
+    snapshot file and an append-only journal of records added since."""
+
+    snapshot_file: str
+    journal_file: str
+    rotated_file: str
+
+    journal: BinaryIO
+    journal_entries: int
+    compacting: bool
+
+    def __init__(self, file_name: str):
+        """Sets up the data store, loading the snapshot and then replaying
+        the journal(s) written since it was taken."""
+
+        self.snapshot_file = file_name + ".snapshot"
+        self.journal_file = file_name + ".journal"
+        self.rotated_file = file_name + ".journal.old"
+
+        records: Dict[str, Record] = {}
+
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, "rt", encoding="utf-8") as handle:
+                records.update((record.name, record) for record in read_records(handle))
+
+        entries: Dict[str, int] = {}
+
+        for journal in [self.rotated_file, self.journal_file]:
+            if os.path.exists(journal):
+                replayed = replay(journal)
+                entries[journal] = len(replayed)
+                records.update((record.name, record) for record in replayed)
+
+        super().__init__(list(records.values()))
+
+        self.compacting = False
+        self._open_journal()
+
+        # The replayed entries still need compacting, even if nothing new
+        # is added.
+        self.journal_entries = entries.get(self.journal_file, 0)
+
+        # A previous compaction was interrupted; finish it now, so that the
+        # rotated journal is never overwritten by the next compaction.
+        if os.path.exists(self.rotated_file):
+            self._write_snapshot(list(records.values()))
+            os.remove(self.rotated_file)
+
+    def _open_journal(self) -> None:
+        # pylint: disable=consider-using-with
+        self.journal = open(self.journal_file, "ab")
+        self.journal_entries = 0
+
+    def _write_append(self, record: Record) -> Optional[bool]:
+        """Append a value to the underlying data store this type implements.
+
+        This function may be a no-op method, in which case it MUST return None.
+        Otherwise, it should return if the write succeeded.
+
+        Values passed to this function SHOULD NOT exist in the store already,
+        so the implement does not need to consider de-duplication.
+        """
+
+        payload = "\t".join(record.to_strings(compact=True)).encode("utf-8")
+
+        self.journal.write(HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+
+        self.journal_entries += 1
+
+        return True
+
+    def _write_list(self, record: List[Record]) -> Optional[bool]:
+        """Writes a new snapshot of the given records, and clears the journal."""
+
+        self._rotate_journal()
+        self._write_snapshot(record)
+        os.remove(self.rotated_file)
+
+        return True
+
+    def _rotate_journal(self) -> None:
+        """Moves the current journal aside, and starts a new one.
+
+        If a previous compaction failed, its rotated journal is still needed,
+        so the current journal is appended to it rather than replacing it."""
+
+        self.journal.close()
+
+        if os.path.exists(self.rotated_file):
+            with open(self.journal_file, "rb") as source:
+                with open(self.rotated_file, "ab") as rotated:
+                    rotated.write(source.read())
+                    rotated.flush()
+                    os.fsync(rotated.fileno())
+
+            # Until this is removed, its records are in both journals, which
+            # replays to the same list.
+            os.remove(self.journal_file)
+        else:
+            os.replace(self.journal_file, self.rotated_file)
+
+        self._open_journal()
+
+    def _write_snapshot(self, records: List[Record]) -> None:
+        """Atomically replaces the snapshot with the given records."""
+
+        temp_file = self.snapshot_file + ".tmp"
+
+        with open(temp_file, "wt", encoding="utf-8") as handle:
+            handle.writelines("\t".join(r.to_strings(compact=True)) + "\n" for r in records)
+            handle.flush()
+            os.fsync(handle.fileno())
+
+        os.replace(temp_file, self.snapshot_file)
+
+    async def compact(self) -> None:
+        """Writes a new snapshot and clears the journal.
+
+        The snapshot is written in a worker thread, with new records going
+        to a fresh journal in the meantime."""
+
+        if self.compacting or not self.known:
+            return
+
+        # A rotated journal left by a failed compaction is retried.
+        if not self.journal_entries and not os.path.exists(self.rotated_file):
+            return
+
+        self.compacting = True
+
+        try:
+            self._rotate_journal()
+
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._write_snapshot, list(self.known.values())
+            )
+
+            os.remove(self.rotated_file)
+        finally:
+            self.compacting = False
+
+    async def compact_periodically(self, interval: float) -> None:
+        """Compacts the store every `interval` seconds, while there are
+        new journal entries to compact."""
+
+        while True:
+            await asyncio.sleep(interval)
+
+            try:
+                await self.compact()
+            except Exception as error:  # pylint: disable=broad-except
+                print("Unable to compact the journal:", error)
+
+    def __exit__(
+        self, exception_type: RaiseType, message: Any, traceback: Any
+    ) -> Optional[bool]:
+        result = super().__exit__(exception_type, message, traceback)
+
+        self.journal.close()
+
+        return result
+
+
+def replay(file_name: str) -> List[Record]:
+    """Reads the records from a journal file.
+
+    Reading stops at the first incomplete or corrupt entry, and the file
+    is truncated there so that later entries are appended after the last
+    valid one."""
+
+    records: List[Record] = []
+
+    with open(file_name, "r+b") as handle:
+        data = handle.read()
+        offset = 0
+
+        while offset + HEADER.size <= len(data):
+            length, checksum = HEADER.unpack_from(data, offset)
+            start = offset + HEADER.size
+            end = start + length
+            payload = data[start:end]
+
+            if len(payload) != length or zlib.crc32(payload) != checksum:
+                break
+
+            records.append(Record.from_strings(*payload.decode("utf-8").split("\t")))
+            offset = end
+
+        if offset != len(data):
+            handle.truncate(offset)
+
+    return records
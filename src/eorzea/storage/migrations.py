@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2021 Benedict Harcourt <ben.harcourt@harcourtprogramming.co.uk>
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""
+Versioned schema migrations for the SQLite data store.
+
+The schema version of a database is tracked in `PRAGMA user_version`.
+Each entry in `MIGRATIONS` upgrades the schema by exactly one version,
+and is run inside its own transaction along with the version bump, so an
+interrupted upgrade leaves the database at the last complete version.
+"""
+
+from __future__ import annotations
+
+from typing import List
+
+import sqlite3
+
+# Values used in the `approved` column.
+PENDING = 0
+APPROVED = 1
+REJECTED = -1
+
+
+MIGRATIONS: List[str] = [
+    # Version 1: the original, unindexed, table.
+    """
+    CREATE TABLE IF NOT EXISTS hopes (
+        name        text UNIQUE,
+        added_by    text,
+        added_from  text,
+        added       timestamp DEFAULT CURRENT_TIMESTAMP,
+        approved    bool
+    );
+    """,
+    # Version 2: integer primary key, normalised submitter and source
+    # tables, and a partial index covering only the approved rows.
+    """
+    CREATE TABLE users (
+        id          integer PRIMARY KEY,
+        name        text NOT NULL UNIQUE
+    );
+
+    CREATE TABLE sources (
+        id          integer PRIMARY KEY,
+        name        text NOT NULL UNIQUE
+    );
+
+    INSERT OR IGNORE INTO users (name)
+        SELECT DISTINCT coalesce(added_by, '') FROM hopes;
+    INSERT OR IGNORE INTO sources (name)
+        SELECT DISTINCT coalesce(added_from, '') FROM hopes;
+
+    ALTER TABLE hopes RENAME TO hopes_v1;
+
+    CREATE TABLE hopes (
+        id          integer PRIMARY KEY,
+        name        text NOT NULL UNIQUE,
+        added_by    integer NOT NULL REFERENCES users (id),
+        added_from  integer NOT NULL REFERENCES sources (id),
+        added       timestamp DEFAULT CURRENT_TIMESTAMP,
+        approved    integer NOT NULL DEFAULT 0
+    );
+
+    INSERT INTO hopes (name, added_by, added_from, added, approved)
+        SELECT
+            old.name,
+            users.id,
+            sources.id,
+            old.added,
+            CAST(coalesce(old.approved, 0) AS integer)
+        FROM hopes_v1 AS old
+        JOIN users ON users.name = coalesce(old.added_by, '')
+        JOIN sources ON sources.name = coalesce(old.added_from, '')
+        WHERE old.name IS NOT NULL
+        ORDER BY old.rowid;
+
+    DROP TABLE hopes_v1;
+
+    CREATE INDEX hopes_approved ON hopes (id) WHERE approved = 1;
+    CREATE INDEX hopes_pending ON hopes (id) WHERE approved = 0;
+
+    CREATE VIEW hope_records AS
+        SELECT
+            hopes.id,
+            hopes.name,
+            users.name AS added_by,
+            sources.name AS added_from,
+            hopes.added,
+            hopes.approved
+        FROM hopes
+        JOIN users ON users.id = hopes.added_by
+        JOIN sources ON sources.id = hopes.added_from;
+    """,
+]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    """Gets the schema version the database is currently at."""
+    return int(conn.execute("PRAGMA user_version").fetchone()[0])
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Upgrades the database to the latest schema version.
+
+    Returns the version the database was at before any migrations were run.
+    Databases from a newer version of the bot are rejected, rather than
+    being written to with an incompatible schema.
+
+    Each migration takes the write lock before checking the version, so when
+    two processes start against the same database, the second waits for the
+    first and then finds there is nothing left to do."""
+
+    initial = schema_version(conn)
+
+    if initial > len(MIGRATIONS):
+        raise Exception(
+            f"Database schema version {initial} is newer than supported ({len(MIGRATIONS)})"
+        )
+
+    version = initial
+
+    while version < len(MIGRATIONS):
+        conn.execute("BEGIN IMMEDIATE")
+
+        try:
+            # Another process may have migrated while this one was waiting.
+            version = schema_version(conn)
+
+            if version < len(MIGRATIONS):
+                for statement in statements(MIGRATIONS[version]):
+                    conn.execute(statement)
+
+                version += 1
+                conn.execute(f"PRAGMA user_version = {version}")
+
+            conn.commit()
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+
+    return initial
+
+
+def statements(script: str) -> List[str]:
+    """Splits a migration script into its individual statements.
+
+    `executescript` would commit the open transaction, so each statement is
+    run on its own within the migration's transaction instead."""
+
+    result: List[str] = []
+    current = ""
+
+    for part in script.split(";"):
+        current += part + ";"
+
+        if sqlite3.complete_statement(current):
+            if current.strip(" \n;"):
+                result.append(current.strip())
+
+            current = ""
+
+    return result
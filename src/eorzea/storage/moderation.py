@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2021 Benedict Harcourt <ben.harcourt@harcourtprogramming.co.uk>
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""Moderation of the names submitted to the SQLite data store."""
+
+from __future__ import annotations
+
+from typing import Iterable, List, Tuple
+
+import sqlite3
+
+from .migrations import APPROVED, PENDING, REJECTED, migrate
+from .record import Record
+
+
+Decision = Tuple[str, int]
+
+
+class ModerationQueue:
+    """Moderation of the names submitted to the SQLite data store.
+
+    Pending names are read a page at a time, and decisions are applied in
+    bulk, with each call to a modifying method being a single transaction."""
+
+    conn: sqlite3.Connection
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+        migrate(self.conn)
+
+    def pending(self, limit: int = 50, after: int = 0) -> List[Tuple[int, Record]]:
+        """Gets a page of names awaiting moderation, oldest first.
+
+        Each name is paired with its id; passing the last id of a page as
+        `after` gets the next page."""
+
+        cursor = self.conn.execute(
+            f"""
+            SELECT id, name, added_by, added_from, added, approved
+            FROM hope_records
+            WHERE approved = {PENDING} AND id > ?
+            ORDER BY id
+            LIMIT ?
+            """,
+            (after, limit),
+        )
+
+        return [(row[0], Record(*row[1:])) for row in cursor]
+
+    def pending_count(self) -> int:
+        """Gets the number of names awaiting moderation."""
+        cursor = self.conn.execute(f"SELECT COUNT(0) FROM hopes WHERE approved = {PENDING}")
+
+        return int(cursor.fetchone()[0])
+
+    def approved_names(self) -> List[str]:
+        """Gets all of the names that have been approved."""
+        cursor = self.conn.execute(f"SELECT name FROM hopes WHERE approved = {APPROVED}")
+
+        return [row[0] for row in cursor]
+
+    def approve(self, names: Iterable[str]) -> int:
+        """Approves the given names, returning how many were updated."""
+        return self.decide((name, APPROVED) for name in names)
+
+    def reject(self, names: Iterable[str]) -> int:
+        """Rejects the given names, returning how many were updated."""
+        return self.decide((name, REJECTED) for name in names)
+
+    def approve_matching(self, pattern: str) -> int:
+        """Approves all pending names matching a GLOB pattern."""
+        return self.decide([], [(pattern, APPROVED)])
+
+    def reject_matching(self, pattern: str) -> int:
+        """Rejects all pending names matching a GLOB pattern."""
+        return self.decide([], [(pattern, REJECTED)])
+
+    def decide(self, decisions: Iterable[Decision], patterns: Iterable[Decision] = ()) -> int:
+        """Applies a set of (name, status) decisions in one transaction.
+
+        Each of the (GLOB pattern, status) pairs in `patterns` is then
+        applied to the names that are still pending, so a pattern never
+        overrides an explicit decision or an earlier moderation.
+
+        Returns the number of names that were updated."""
+
+        with self.conn:
+            cursor = self.conn.executemany(
+                "UPDATE hopes SET approved = ? WHERE name = ?",
+                ((status, name) for name, status in decisions),
+            )
+            updated = max(0, cursor.rowcount)
+
+            for pattern, status in patterns:
+                cursor = self.conn.execute(
+                    f"UPDATE hopes SET approved = ? WHERE approved = {PENDING} AND name GLOB ?",
+                    (status, pattern),
+                )
+                updated += max(0, cursor.rowcount)
+
+        return updated
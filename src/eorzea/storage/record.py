@@ -6,21 +6,119 @@
 
 from __future__ import annotations
 
-from typing import Type
+from typing import Any, List, Type, Union
 
-from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from sys import intern
+import time
+
+
+Timestamp = Union[datetime, int, str, None]
+
+EPOCH = datetime(1970, 1, 1)
+SECOND = timedelta(seconds=1)
 
 
-@dataclass
 class Record:
+    """A name submitted to a data store.
+
+    A store holds one of these for every name it knows, so they are kept
+    small: there is no per-instance dict, the submitter and source strings
+    (which repeat heavily) are interned, and the time the name was added is
+    held as integer seconds since the epoch rather than a `datetime`."""
+
+    __slots__ = ("name", "added_by", "added_from", "timestamp", "approved")
+
     name: str
     added_by: str
     added_from: str
-    added: datetime = field(default_factory=datetime.utcnow)
-    approved: bool = False
+    timestamp: int
+    approved: bool
+
+    def __init__(
+        self,
+        name: str,
+        added_by: str,
+        added_from: str,
+        added: Timestamp = None,
+        approved: Any = False,
+    ):
+        self.name = name
+        self.added_by = intern(added_by)
+        self.added_from = intern(added_from)
+        self.timestamp = to_epoch(added)
+        self.approved = bool(approved)
+
+    @property
+    def added(self) -> datetime:
+        """The (naive, UTC) time at which this record was added."""
+        return EPOCH + self.timestamp * SECOND
 
     @classmethod
     def from_strings(cls: Type[Record], *args: str) -> Record:
-        date = datetime.strptime(args[2], "")
-        return cls(args[0], args[1], args[2], date, bool(args[4]))
+        """Creates a record from the fields written by `to_strings`."""
+        return cls(args[0], args[1], args[2], args[3], args[4] in TRUTHY)
+
+    def to_strings(self, compact: bool = False) -> List[str]:
+        """Converts this record to a list of tab-free fields.
+
+        The timestamp is written as ISO 8601, or as integer seconds since
+        the epoch when `compact` is set; `from_strings` accepts either."""
+
+        added = str(self.timestamp) if compact else self.added.isoformat(sep=" ")
+
+        return [
+            self.name.replace("\t", " "),
+            self.added_by.replace("\t", " "),
+            self.added_from.replace("\t", " "),
+            added,
+            "1" if self.approved else "0",
+        ]
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Record):
+            return NotImplemented
+
+        return (
+            self.name == other.name
+            and self.added_by == other.added_by
+            and self.added_from == other.added_from
+            and self.timestamp == other.timestamp
+            and self.approved == other.approved
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"Record(name={self.name!r}, added_by={self.added_by!r}, "
+            f"added_from={self.added_from!r}, added={self.added!r}, "
+            f"approved={self.approved!r})"
+        )
+
+
+TRUTHY = frozenset(["1", "True", "true"])
+
+
+def to_epoch(value: Timestamp) -> int:
+    """Converts any of the accepted timestamp forms to seconds since the epoch.
+
+    Naive `datetime`s, and ISO 8601 strings without an offset (as written by
+    SQLite and `Record.to_strings`) are taken to be in UTC. Both of the
+    string formats have a fixed layout, so this avoids the (much slower)
+    format string parsing done by `datetime.strptime`."""
+
+    if value is None:
+        return int(time.time())
+
+    if isinstance(value, int):
+        return value
+
+    if isinstance(value, str):
+        if value.isdigit():
+            return int(value)
+
+        value = datetime.fromisoformat(value)
+
+    if value.tzinfo:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return (value - EPOCH) // SECOND
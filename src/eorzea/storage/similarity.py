@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2021 Benedict Harcourt <ben.harcourt@harcourtprogramming.co.uk>
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""Detection of near-duplicate names, such as "Y'shtola" and "yshtola "."""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Union
+
+import unicodedata
+
+
+# Keys shorter than this are too short for a one character difference to
+# suggest a typo, rather than a different name.
+FUZZY_MIN_LENGTH = 5
+
+
+class NameIndex:
+    """Index of names by their normalised form, and optionally by deletions.
+
+    Normalised lookups find names that differ only in case, accents,
+    punctuation and spacing. The deletion index additionally finds names
+    that are a typo away: it maps every normalised key with one character
+    removed back to that key, so an inserted, removed, changed or swapped
+    character can be found with a handful of dictionary lookups rather
+    than comparing against every known name.
+
+    To halve the memory used by the deletion index, the deleted strings are
+    stored by hash, and single keys are stored without a list. A hash
+    collision can only produce a spurious suggestion from `similar`."""
+
+    keys: Dict[str, str]
+    deletions: Optional[Dict[int, Union[str, List[str]]]]
+
+    def __init__(self, names: Iterable[str] = (), fuzzy: bool = False):
+        self.keys = {}
+        self.deletions = {} if fuzzy else None
+
+        for name in names:
+            self.add(name)
+
+    def add(self, name: str) -> None:
+        """Adds a name to the index.
+
+        Where multiple names normalise to the same key, the first is kept."""
+
+        key = normalise(name)
+
+        if not key or key in self.keys:
+            return
+
+        self.keys[key] = name
+
+        if self.deletions is not None and len(key) >= FUZZY_MIN_LENGTH:
+            for deletion in deletions(key):
+                existing = self.deletions.setdefault(hash(deletion), key)
+
+                if isinstance(existing, list):
+                    existing.append(key)
+                elif existing != key:
+                    self.deletions[hash(deletion)] = [existing, key]
+
+    def find(self, name: str) -> Optional[str]:
+        """Finds the indexed name that this name normalises to the same as."""
+        return self.keys.get(normalise(name))
+
+    def similar(self, name: str, limit: int = 5) -> List[str]:
+        """Finds indexed names that are one typo away from this name.
+
+        Returns at most `limit` names, with those that are an extra or
+        missing character away before those that are a changed or swapped
+        character away. This is always empty if fuzzy indexing is disabled."""
+
+        key = normalise(name)
+
+        if self.deletions is None or len(key) < FUZZY_MIN_LENGTH:
+            return []
+
+        query = deletions(key)
+
+        # Known keys that have one more character than the query,
+        # then known keys that have one fewer.
+        found = self._lookup(key)
+        found.extend(other for other in query if other in self.keys)
+
+        # Known keys that share a deletion with the query.
+        for deletion in query:
+            found.extend(self._lookup(deletion))
+
+        results = dict.fromkeys(other for other in found if other != key)
+
+        return [self.keys[other] for other in list(results)[:limit]]
+
+    def _lookup(self, deletion: str) -> List[str]:
+        """Gets the keys that have the given string as a deletion."""
+
+        if self.deletions is None:
+            return []
+
+        keys = self.deletions.get(hash(deletion), [])
+
+        return [keys] if isinstance(keys, str) else list(keys)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+def normalise(name: str) -> str:
+    """Normalises a name to compare for near-duplicates.
+
+    The name is case folded, and all accents, punctuation and whitespace
+    are removed."""
+
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+
+    return "".join(char for char in decomposed if char.isalnum())
+
+
+def deletions(key: str) -> List[str]:
+    """Gets the distinct strings formed by removing one character from a key."""
+    return list(dict.fromkeys(key[:i] + key[j:] for i, j in enumerate(range(1, len(key) + 1))))
@@ -8,40 +8,129 @@
 
 from __future__ import annotations
 
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional
 
 import sqlite3
 
 from .datastore import DataStore, RaiseType
+from .migrations import APPROVED, migrate
 from .record import Record
+from .similarity import NameIndex
 
 
 class SQLite(DataStore):
-    """Data store backed in SQLite 3"""
+    """Data store backed in SQLite 3
+
+    With `cache` set, every record is loaded into memory at start up, and
+    kept up to date as records are added. Duplicate (and near-duplicate)
+    submissions and random picks are then served from memory, with SQLite
+    as the durable store.
+    Changes committed by other connections (such as the moderation tool)
+    are picked up the next time the cache is read: only rows added since
+    the cache was loaded are read, along with the list of approved names,
+    as moderation only ever changes whether a name is approved."""
 
     conn: sqlite3.Connection
     cursor: sqlite3.Cursor
 
-    def __init__(self, file_name: str):
+    _approved: List[str]
+    _data_version: int
+    _last_id: int
+
+    def __init__(self, file_name: str, cache: bool = False, fuzzy: bool = False):
         """Sets up the data store"""
 
-        super().__init__()
+        super().__init__(fuzzy=fuzzy)
 
         self.conn = sqlite3.connect(file_name)
         self.conn.row_factory = sqlite3.Row
         self.cursor = self.conn.cursor()
+
+        migrate(self.conn)
+
+        self._approved = []
+        self._data_version = 0
+        self._last_id = 0
+
+        if cache:
+            self.refresh()
+
+    def refresh(self) -> None:
+        """(Re)loads the in-memory cache of records from the database."""
+
+        self._data_version = self._current_data_version()
+        self._last_id = 0
+
+        known: Dict[str, Record] = {}
+        approved: List[str] = []
+
+        for record in self._read_new():
+            known[record.name] = record
+
+            if record.approved:
+                approved.append(record.name)
+
+        self.known = known
+        self.index = NameIndex(known, self.index.deletions is not None)
+        self._approved = approved
+
+    def _update(self, known: Dict[str, Record]) -> None:
+        """Brings the cache up to date with changes from other connections.
+
+        Rows added since the cache was loaded are read and indexed, and then
+        the approved names are re-read, without touching any other rows."""
+
+        self._data_version = self._current_data_version()
+
+        for record in self._read_new():
+            if record.name not in known:
+                known[record.name] = record
+                self.index.add(record.name)
+
+        self.cursor.execute(f"SELECT name FROM hopes WHERE approved = {APPROVED} ORDER BY id")
+        approved = [row[0] for row in self.cursor]
+
+        # Only the names whose moderation changed need their record updated.
+        now = set(approved)
+
+        for name in now.symmetric_difference(self._approved):
+            if name in known:
+                known[name].approved = name in now
+
+        self._approved = approved
+
+    def _read_new(self) -> List[Record]:
+        """Reads the records with ids after the last one read."""
+
         self.cursor.execute(
             """
-            CREATE TABLE IF NOT EXISTS hopes (
-                name        text UNIQUE,
-                added_by    text,
-                added_from  text,
-                added       timestamp DEFAULT CURRENT_TIMESTAMP,
-                approved    bool
-            )
-        """
+            SELECT id, name, added_by, added_from, added, approved
+            FROM hope_records
+            WHERE id > ?
+            ORDER BY id
+            """,
+            (self._last_id,),
         )
-        self.conn.commit()
+
+        records: List[Record] = []
+
+        for row in self.cursor:
+            records.append(Record(row[1], row[2], row[3], row[4], row[5] == APPROVED))
+            self._last_id = row[0]
+
+        return records
+
+    def _current_data_version(self) -> int:
+        """Gets a value that changes whenever another connection commits."""
+        return int(self.conn.execute("PRAGMA data_version").fetchone()[0])
+
+    def _cache(self) -> Optional[Dict[str, Record]]:
+        """Gets the cache, if in use, reloading it if it is out of date."""
+
+        if self.known is not None and self._current_data_version() != self._data_version:
+            self._update(self.known)
+
+        return self.known
 
     def _write_append(self, record: Record) -> Optional[bool]:
         """Append a record to the underlying data store this type implements.
@@ -54,8 +143,29 @@ class SQLite(DataStore):
         """
 
         self.cursor.execute(
-            "INSERT OR IGNORE INTO hopes VALUES (?,?,?,?,?)",
-            (record.name, record.added_by, record.added_from, record.added, record.approved),
+            "INSERT OR IGNORE INTO users (name) VALUES (?)", (record.added_by,)
+        )
+        self.cursor.execute(
+            "INSERT OR IGNORE INTO sources (name) VALUES (?)", (record.added_from,)
+        )
+        self.cursor.execute(
+            """
+            INSERT OR IGNORE INTO hopes (name, added_by, added_from, added, approved)
+            VALUES (
+                ?,
+                (SELECT id FROM users WHERE name = ?),
+                (SELECT id FROM sources WHERE name = ?),
+                ?,
+                ?
+            )
+            """,
+            (
+                record.name,
+                record.added_by,
+                record.added_from,
+                record.added,
+                int(record.approved),
+            ),
         )
         self.conn.commit()
 
@@ -64,8 +174,37 @@ class SQLite(DataStore):
     def random(self) -> Record:
         """Selects a random element from this store."""
 
+        known = self._cache()
+
+        if known is not None:
+            if not self._approved:
+                raise Exception("Empty storage")
+
+            record = known[self.rand.choice(self._approved)]
+            self.seen.add(record.name)
+
+            return record
+
+        # Picking an offset into the partial index of approved ids avoids
+        # sorting every row by a random key; the full row is then looked up
+        # for the single chosen id. The approved value is inlined, as SQLite
+        # will not use a partial index for a bound parameter.
+        count = len(self)
+
+        if not count:
+            raise Exception("Empty storage")
+
+        offset = self.rand.randrange(count)
+
         self.cursor.execute(
-            "SELECT * FROM hopes WHERE approved = true ORDER BY RANDOM() LIMIT 1"
+            f"""
+            SELECT name, added_by, added_from, added, approved
+            FROM hope_records
+            WHERE id = (
+                SELECT id FROM hopes WHERE approved = {APPROVED} ORDER BY id LIMIT 1 OFFSET ?
+            )
+            """,
+            (offset,),
         )
 
         record = Record(**self.cursor.fetchone())
@@ -73,8 +212,46 @@ class SQLite(DataStore):
 
         return record
 
+    def sample(self, count: int) -> List[Record]:
+        """Selects up to `count` distinct random elements from this store."""
+
+        known = self._cache()
+
+        if known is not None:
+            if not self._approved:
+                raise Exception("Empty storage")
+
+            names = self.rand.sample(self._approved, min(count, len(self._approved)))
+            records = [known[name] for name in names]
+        else:
+            self.cursor.execute(
+                f"""
+                SELECT name, added_by, added_from, added, approved
+                FROM hope_records
+                WHERE id IN (
+                    SELECT id FROM hopes WHERE approved = {APPROVED} ORDER BY RANDOM() LIMIT ?
+                )
+                """,
+                (count,),
+            )
+
+            records = [Record(**row) for row in self.cursor]
+
+            if not records:
+                raise Exception("Empty storage")
+
+            # The rows come back in id order, rather than the random order.
+            self.rand.shuffle(records)
+
+        self.seen.update(record.name for record in records)
+
+        return records
+
     def __len__(self) -> int:
-        self.cursor.execute("SELECT COUNT(0) FROM hopes WHERE approved == true")
+        if self._cache() is not None:
+            return len(self._approved)
+
+        self.cursor.execute(f"SELECT COUNT(0) FROM hopes WHERE approved = {APPROVED}")
 
         return int(self.cursor.fetchone()[0])
 
@@ -1,27 +1,130 @@
 #!/usr/bin/env python3
 
-"""Final Fantasy XIV Moderation"""
+"""Final Fantasy XIV Moderation
+
+Run with no options to moderate interactively, a page of names at a time.
+Each page's decisions are saved together once the page is complete.
+Names that look like a duplicate of, or a typo away from, an approved
+name are flagged.
+
+With `--batch FILE`, decisions are instead read from a file with one
+tab-separated decision and name per line, all applied in one transaction:
+
+    y   Name To Approve
+    n   Name To Reject
+    y*  Pattern* To Approve
+    n*  Pattern* To Reject
+
+The starred forms take a GLOB pattern, and only affect pending names.
+Blank lines and lines starting with `#` are ignored."""
 
 from __future__ import annotations
 
+from typing import List, TextIO
+
+import argparse
 import sqlite3
+import sys
+
+from eorzea.storage.migrations import APPROVED, REJECTED
+from eorzea.storage.moderation import Decision, ModerationQueue
+from eorzea.storage.similarity import NameIndex
+
+
+DECISIONS = {"y": APPROVED, "n": REJECTED}
 
 
 def main() -> None:
-    with sqlite3.connect("/srv/eorzea/list.db") as connection:
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM hopes WHERE approved = 0")
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("database", nargs="?", default="/srv/eorzea/list.db")
+    parser.add_argument("--batch", type=argparse.FileType("rt", encoding="utf-8"))
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+
+    with sqlite3.connect(args.database) as connection:
+        queue = ModerationQueue(connection)
+
+        if args.batch:
+            batch(queue, args.batch)
+        else:
+            interactive(queue, args.page_size)
+
+
+def interactive(queue: ModerationQueue, page_size: int) -> None:
+    print(f"{queue.pending_count()} names pending")
+
+    index = NameIndex(queue.approved_names(), fuzzy=True)
+
+    after = 0
+
+    while True:
+        page = queue.pending(page_size, after)
+
+        if not page:
+            break
+
+        decisions: List[Decision] = []
+
+        try:
+            for record_id, record in page:
+                hint = duplicate_hint(index, record.name)
+                print(
+                    f"{record.name:<40}\t{record.added_by}:{record.added_from}{hint} >",
+                    end="",
+                )
+                char = input("").lower()
+
+                if char in DECISIONS:
+                    decisions.append((record.name, DECISIONS[char]))
+
+                if DECISIONS.get(char) == APPROVED:
+                    index.add(record.name)
+
+                after = record_id
+        except EOFError:
+            # Keep the decisions made so far on this page.
+            queue.decide(decisions)
+            return
+
+        queue.decide(decisions)
+
+
+def duplicate_hint(index: NameIndex, name: str) -> str:
+    duplicate = index.find(name)
+
+    if duplicate:
+        return f" [duplicate of {duplicate}]"
+
+    similar = index.similar(name)
+
+    return f" [similar to {', '.join(similar)}]" if similar else ""
+
+
+def batch(queue: ModerationQueue, handle: TextIO) -> None:
+    decisions: List[Decision] = []
+    patterns: List[Decision] = []
+
+    for number, line in enumerate(handle, 1):
+        line = line.rstrip("\n")
+
+        if not line.strip() or line.startswith("#"):
+            continue
+
+        [char, _, name] = line.partition("\t")
+        char = char.strip().lower()
+
+        if char.rstrip("*") not in DECISIONS or not name:
+            print(f"Unable to parse line {number}: {line!r}", file=sys.stderr)
+            sys.exit(1)
 
-        for record in cursor.fetchall():
-            print("{:<40}\t{}:{} >".format(*record[0:3]), end="")
-            char = input("")
+        if char.endswith("*"):
+            patterns.append((name, DECISIONS[char.rstrip("*")]))
+        else:
+            decisions.append((name, DECISIONS[char]))
 
-            if char in ["y", "Y"]:
-                cursor.execute("UPDATE hopes SET approved = 1 WHERE name = ?", (record[0],))
-            elif char in ["n", "N"]:
-                cursor.execute("UPDATE hopes SET approved = -1 WHERE name = ?", (record[0],))
+    updated = queue.decide(decisions, patterns)
 
-            connection.commit()
+    print(f"Updated {updated} names, {queue.pending_count()} still pending")
 
 
 if __name__ == "__main__":
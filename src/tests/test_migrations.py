@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2021 Benedict Harcourt <ben.harcourt@harcourtprogramming.co.uk>
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""Tests for the SQLite schema migrations."""
+
+from __future__ import annotations
+
+from typing import List
+
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from eorzea.storage.migrations import MIGRATIONS, migrate, schema_version
+
+
+# The table as created by the bot before schema versions were tracked.
+BASELINE = """
+    CREATE TABLE hopes (
+        name        text UNIQUE,
+        added_by    text,
+        added_from  text,
+        added       timestamp DEFAULT CURRENT_TIMESTAMP,
+        approved    bool
+    )
+"""
+
+ROWS = [
+    ("Approved Name", "alice", "twitch", "2021-01-01 00:00:00", 1),
+    ("Rejected Name", "bob", "discord", "2021-01-02 00:00:00", -1),
+    ("Pending Name", "alice", "discord", "2021-01-03 00:00:00", 0),
+    ("Anonymous Name", None, None, "2021-01-04 00:00:00", 1),
+    ("Unmoderated Name", "carol", "twitch", "2021-01-05 00:00:00", None),
+]
+
+
+class MigrationTest(unittest.TestCase):
+    file_name: str
+
+    def setUp(self) -> None:
+        handle, self.file_name = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+
+        with sqlite3.connect(self.file_name) as conn:
+            conn.execute(BASELINE)
+            conn.executemany("INSERT INTO hopes VALUES (?, ?, ?, ?, ?)", ROWS)
+
+        conn.close()
+
+    def tearDown(self) -> None:
+        os.remove(self.file_name)
+
+    def test_baseline_rows_survive(self) -> None:
+        conn = sqlite3.connect(self.file_name)
+
+        self.assertEqual(migrate(conn), 0)
+        self.assertEqual(schema_version(conn), len(MIGRATIONS))
+
+        rows = conn.execute(
+            "SELECT name, added_by, added_from, added, approved FROM hope_records ORDER BY id"
+        ).fetchall()
+
+        conn.close()
+
+        self.assertEqual(
+            rows,
+            [
+                ("Approved Name", "alice", "twitch", "2021-01-01 00:00:00", 1),
+                ("Rejected Name", "bob", "discord", "2021-01-02 00:00:00", -1),
+                ("Pending Name", "alice", "discord", "2021-01-03 00:00:00", 0),
+                ("Anonymous Name", "", "", "2021-01-04 00:00:00", 1),
+                ("Unmoderated Name", "carol", "twitch", "2021-01-05 00:00:00", 0),
+            ],
+        )
+
+    def test_migrate_is_idempotent(self) -> None:
+        conn = sqlite3.connect(self.file_name)
+
+        migrate(conn)
+
+        self.assertEqual(migrate(conn), len(MIGRATIONS))
+        self.assertEqual(conn.execute("SELECT COUNT(0) FROM hopes").fetchone()[0], len(ROWS))
+
+        conn.close()
+
+    def test_concurrent_migrations(self) -> None:
+        errors: List[Exception] = []
+
+        def run() -> None:
+            conn = sqlite3.connect(self.file_name, timeout=30)
+
+            try:
+                migrate(conn)
+            except Exception as error:  # pylint: disable=broad-except
+                errors.append(error)
+            finally:
+                conn.close()
+
+        threads = [threading.Thread(target=run) for _ in range(4)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+
+        conn = sqlite3.connect(self.file_name)
+
+        self.assertEqual(schema_version(conn), len(MIGRATIONS))
+        self.assertEqual(conn.execute("SELECT COUNT(0) FROM hopes").fetchone()[0], len(ROWS))
+
+        conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()